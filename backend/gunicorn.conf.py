@@ -0,0 +1,18 @@
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5001")
+
+# One process: orchestrator sessions, the current conversation and the caches live in
+# process memory. Threads overlap the requests waiting on OpenRouter and Fish Audio.
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+# "gevent" (pip install gevent) parks each waiting request on a greenlet instead of an OS
+# thread, so one worker can hold many more slow upstream calls; the app code is unchanged
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+# Concurrent requests per gevent worker; ignored by gthread
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Model calls retry with backoff, so allow well past a single 30s read
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
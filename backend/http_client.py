@@ -0,0 +1,109 @@
+import io
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# (connect, read) seconds, used when a call does not pass its own timeout; the connect timeout sits
+# just past the 3s TCP SYN retransmit so one lost SYN does not fail the connect
+DEFAULT_TIMEOUT = (3.05, 30)
+
+# Rate limits and transient upstream errors are worth another attempt
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# For streamed uploads, whose bodies cannot be replayed: POSTs are only retried on connection failures
+UPLOAD_RETRY_METHODS = Retry.DEFAULT_ALLOWED_METHODS
+
+
+class _TimeoutAdapter(HTTPAdapter):
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class MultipartStream:
+    """multipart/form-data body that reads the file part lazily, for ``data=`` on a session post.
+
+    requests' ``files=`` encodes the whole body in memory first; this hands the file through in
+    blocks instead. ``fileobj`` must be seekable so the Content-Length can be sent up front.
+    """
+
+    def __init__(self, fields: dict[str, str], name: str, filename: str, fileobj, content_type: str):
+        boundary = os.urandom(16).hex()
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = "".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'
+            for key, value in fields.items()
+        )
+        filename = filename.replace('"', "%22").replace("\r", "").replace("\n", "")
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        )
+        head = head.encode("utf-8")
+        tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+        start = fileobj.tell()
+        size = fileobj.seek(0, io.SEEK_END) - start
+        fileobj.seek(start)
+        self._parts = [io.BytesIO(head), fileobj, io.BytesIO(tail)]
+        self._length = len(head) + size + len(tail)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        while self._parts and size != 0:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+
+def make_session(
+    pool_size: int = 32,
+    retries: int = 3,
+    backoff_factor: float = 0.3,
+    retry_methods: frozenset[str] = Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+    headers: dict[str, str] | None = None,
+) -> requests.Session:
+    """Build a keep-alive requests session with a sized connection pool, a default timeout and retries.
+
+    POSTs are retried on RETRY_STATUSES by default; pass ``UPLOAD_RETRY_METHODS`` for sessions that
+    upload streamed bodies. The OpenRouter model calls go through httpx and retry in
+    openrouter.post_with_retry instead. ``headers`` (e.g. auth)
+    are sent with every request on the session.
+    """
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    adapter = _TimeoutAdapter(
+        pool_connections=16,
+        pool_maxsize=pool_size,
+        # Connection failures are always safe to retry. Read failures are not: the upstream may
+        # already be working on (and billing) a POST, and another 30s wait doubles the worst case
+        max_retries=Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=retry_methods,
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
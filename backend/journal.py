@@ -1,7 +1,12 @@
+import functools
+import json as _json
 import re
-import requests
+from openrouter import call_model_with_system, stream_model_with_system
 from datetime import datetime, timezone
 
+_JSON_FENCE = re.compile(r"```json\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_ANY_FENCE = re.compile(r"```[\s\S]*?```")
+
 
 """def _is_problem_heuristic(text: str) -> bool:
     if not text:
@@ -17,40 +22,38 @@ from datetime import datetime, timezone
 
 def _extract_json_from_fence(text: str):
     try:
-        m = re.search(r"```json\s*(.*?)```", text, re.DOTALL | re.IGNORECASE)
+        m = _JSON_FENCE.search(text)
         if not m:
             return None
-        import json as _json
         return _json.loads(m.group(1))
     except Exception:
         return None
 
 
-def _call_model_with_system(system_prompt: str, user_content: str, *, model: str, max_tokens: int, temperature: float,
-                             openrouter_api_key: str, openrouter_url: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {openrouter_api_key}",
-        "Content-Type": "application/json",
-    }
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content},
-        ],
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-    }
-    resp = requests.post(openrouter_url, headers=headers, json=payload)
-    resp.raise_for_status()
-    return resp.json()["choices"][0]["message"]["content"]
+def _prose_only(on_token):
+    """Wrap ``on_token`` to pass plain-text deltas and go quiet at the first fence, which carries a ProblemBrief."""
+    fenced = False
+
+    def forward(delta: str) -> None:
+        nonlocal fenced
+        if fenced or "`" in delta:
+            fenced = True
+            return
+        on_token(delta)
+    return forward
 
 
-def run_journal(user_text: str, prompt_journal: str | None, openrouter_api_key: str, openrouter_url: str, logger=None) -> tuple[str, dict | None, str | None]:
+def run_journal(user_text: str, prompt_journal: str | None, openrouter_api_key: str, openrouter_url: str, logger=None, client=None, cache=None,
+                on_token=None) -> tuple[str, dict | None, str | None]:
+    """``on_token``, if given, receives the reply's text as it streams in; the returned summary is still authoritative."""
     if not prompt_journal:
         return "Noted.", None, None
+    if on_token is None:
+        call = call_model_with_system
+    else:
+        call = functools.partial(stream_model_with_system, on_token=_prose_only(on_token))
     try:
-        content = _call_model_with_system(
+        content = call(
             prompt_journal,
             user_text,
             model="anthropic/claude-3-haiku",
@@ -58,11 +61,13 @@ def run_journal(user_text: str, prompt_journal: str | None, openrouter_api_key:
             temperature=0.1,
             openrouter_api_key=openrouter_api_key,
             openrouter_url=openrouter_url,
+            client=client,
+            cache=cache,
         )
         brief = _extract_json_from_fence(content)
         if brief and isinstance(brief, dict) and brief.get("type") == "ProblemBrief":
             return "I detected a problem worth automating. I'll dig into details.", brief, None
-        sanitized = re.sub(r"```[\s\S]*?```", "", content).strip()
+        sanitized = _ANY_FENCE.sub("", content).strip()
         lines = [ln.strip() for ln in sanitized.splitlines() if ln.strip()]
         if not lines:
             return "Noted.", None, None
@@ -0,0 +1,69 @@
+import sqlite3
+import threading
+import time
+
+
+# Bump when the columns change; the index is derived from the logs, so it is rebuilt rather than migrated
+SCHEMA_VERSION = 3
+
+COLUMNS = ("id", "title", "created_at", "updated_at", "summary", "n_messages", "preview")
+
+
+class JournalIndex:
+    """Listing fields of every conversation in one SQLite table, kept in step with the conversation logs."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS journal")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS journal (id TEXT PRIMARY KEY, title TEXT, created_at TEXT, updated_at TEXT, "
+            "summary TEXT, n_messages INTEGER, preview TEXT, indexed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_updated ON journal(updated_at DESC, id DESC)")
+
+    def upsert(self, row: dict) -> None:
+        values = [row.get(column) for column in COLUMNS]
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO journal ({', '.join(COLUMNS)}, indexed_at) VALUES ({', '.join('?' * len(COLUMNS))}, ?)",
+                (*values, time.time()),
+            )
+
+    def update(self, entry_id: str, **fields) -> None:
+        """Overwrite some columns of an existing row; unknown keys are ignored."""
+        fields = {k: v for k, v in fields.items() if k in COLUMNS and k != "id"}
+        if not fields:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._db.execute(
+                f"UPDATE journal SET {assignments}, indexed_at = ? WHERE id = ?",
+                (*fields.values(), time.time(), entry_id),
+            )
+
+    def delete(self, entry_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM journal WHERE id = ?", (entry_id,))
+
+    def indexed_at(self) -> dict[str, float]:
+        """{id: time the row was last written}, for spotting logs changed behind the index's back."""
+        with self._lock:
+            return dict(self._db.execute("SELECT id, indexed_at FROM journal").fetchall())
+
+    def list(self, limit: int = -1, before: tuple[str, str] | None = None) -> list[dict]:
+        """Rows newest first, optionally only those after the (updated_at, id) ``before`` in that order.
+
+        The id breaks ties, so rows sharing the boundary row's updated_at are not skipped. A negative
+        limit returns them all.
+        """
+        where = "WHERE (updated_at, id) < (?, ?) " if before else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM journal {where}ORDER BY updated_at DESC, id DESC LIMIT ?",
+                (*before, limit) if before else (limit,),
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
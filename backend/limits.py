@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+
+class Throttle:
+    """Caps concurrent calls to an upstream API and, optionally, their rate per minute.
+
+    Use as a context manager around each request. ``rpm`` <= 0 disables the rate limit.
+    ``hold_off`` pauses every caller, e.g. for a 429's Retry-After.
+    """
+
+    def __init__(self, max_concurrency: int, rpm: int = 0):
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._rpm = rpm
+        self._tokens = float(rpm)
+        self._refilled = time.monotonic()
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_for_token(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._not_before - now
+                if wait <= 0 and self._rpm > 0:
+                    # Token bucket: refill continuously, bursting up to one minute's worth
+                    self._tokens = min(self._rpm, self._tokens + (now - self._refilled) * self._rpm / 60)
+                    self._refilled = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) * 60 / self._rpm
+                elif wait <= 0:
+                    return
+            time.sleep(wait)
+
+    def hold_off(self, seconds: float) -> None:
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+    def __enter__(self):
+        # Wait for the rate limit before taking a slot so waiting callers do not hold one
+        self._wait_for_token()
+        self._slots.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+        return False
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Parse a Retry-After header given in seconds; HTTP-date values are left to the caller's backoff."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+# Shared by every OpenRouter call in the backend
+OPENROUTER_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "8"))
+OPENROUTER_RPM = int(os.getenv("OPENROUTER_RPM", "0"))
+OPENROUTER_THROTTLE = Throttle(OPENROUTER_MAX_CONCURRENCY, OPENROUTER_RPM)
@@ -0,0 +1,86 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    # Near-identical inputs ("Noted.", "noted", "  noted ") share one entry
+    return _WHITESPACE.sub(" ", text).strip().strip(".!?").lower()
+
+
+class ResponseCache:
+    """In-memory LRU of model replies keyed by model, system prompt and normalized user content."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_content: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        for part in (model, system_prompt, _normalize(user_content)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.digest()
+
+    def get(self, key: bytes) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache:
+    """Persistent string cache in SQLite, trimmed to the newest max_entries rows."""
+
+    def __init__(self, path, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries (key, value, created) VALUES (?, ?, ?)", (key, value, time.time()))
+            self._writes += 1
+            # Trimming scans the table, so only do it every so often
+            if self._writes % 1000 == 0:
+                self._db.execute(
+                    "DELETE FROM entries WHERE key NOT IN (SELECT key FROM entries ORDER BY created DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
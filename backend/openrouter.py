@@ -0,0 +1,171 @@
+import contextlib
+import functools
+import logging
+import os
+import random
+import time
+
+import httpx
+import orjson
+import requests
+
+from http_client import RETRY_STATUSES, make_session
+from limits import OPENROUTER_THROTTLE, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))
+
+# Failures before the request reached OpenRouter. Read failures are not retried: the completion may
+# already be running (and billed), and another full read timeout doubles the worst case. requests'
+# ReadTimeout is not a ConnectionError, so it propagates too
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, requests.ConnectionError)
+
+# For calls made without a client; post_with_retry does the retrying, so the adapter must not as well
+_FALLBACK = make_session(retries=0)
+
+
+@functools.lru_cache(maxsize=4)
+def headers(openrouter_api_key: str) -> dict:
+    # Content-Type is set by json=; treat the returned dict as read-only
+    return {
+        "Authorization": f"Bearer {openrouter_api_key}",
+        "anthropic-beta": "prompt-caching-2024-07-31",
+    }
+
+
+@functools.lru_cache(maxsize=8)
+def system_message(system_prompt: str) -> dict:
+    # The system prompt is identical every turn, so let the provider cache it;
+    # only the user message varies
+    return {"role": "system", "content": [
+        {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}},
+    ]}
+
+
+def _send(client, url: str, stream: bool, kwargs: dict):
+    if isinstance(client, requests.Session):
+        return client.post(url, stream=stream, **kwargs)
+    if stream:
+        return client.send(client.build_request("POST", url, **kwargs), stream=True)
+    return client.post(url, **kwargs)
+
+
+def post_with_retry(client, url: str, *, stream: bool = False, throttled: bool = True, **kwargs):
+    """POST to OpenRouter, retrying RETRY_STATUSES replies and failures to connect with exponential backoff plus jitter.
+
+    ``client`` is an httpx client or requests session. The last reply is returned whatever its status.
+    With ``stream=True`` the body is left unread and the caller must close the response.
+    ``throttled=False`` is for callers already holding an OPENROUTER_THROTTLE slot.
+    """
+    for attempt in range(OPENROUTER_MAX_RETRIES + 1):
+        last_attempt = attempt == OPENROUTER_MAX_RETRIES
+        delay = 0.5 * 2 ** attempt + random.uniform(0, 0.25)
+        try:
+            with OPENROUTER_THROTTLE if throttled else contextlib.nullcontext():
+                response = _send(client, url, stream, kwargs)
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            response.close()
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            if response.status_code == 429 and retry_after is not None:
+                # The limit is account-wide, so every caller waits it out, not just this one
+                OPENROUTER_THROTTLE.hold_off(retry_after)
+                delay = max(delay, retry_after)
+            logger.warning("OpenRouter returned %d; retrying in %.1fs (attempt %d)", response.status_code, delay, attempt + 1)
+        except _RETRYABLE_ERRORS as e:
+            if last_attempt:
+                raise
+            logger.warning("OpenRouter request failed: %s; retrying (attempt %d)", e, attempt + 1)
+        time.sleep(delay)
+
+
+def _payload(system_prompt: str, user_content: str, model: str, max_tokens: int, temperature: float) -> dict:
+    return {
+        "model": model,
+        "messages": [
+            system_message(system_prompt),
+            {"role": "user", "content": user_content},
+        ],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+
+
+def call_model_with_system(system_prompt: str, user_content: str, *, model: str, max_tokens: int, temperature: float,
+                           openrouter_api_key: str, openrouter_url: str, client=None, cache=None) -> str:
+    """One system + user completion, returning the reply text.
+
+    ``client`` is an httpx client or requests session; a keep-alive session is used without one.
+    429/5xx replies are retried through post_with_retry. Repeat inputs are answered from ``cache``
+    (a ResponseCache) without a round-trip.
+    """
+    cache_key = cache.key(model, system_prompt, user_content) if cache is not None else None
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    # Only built on a cache miss
+    payload = _payload(system_prompt, user_content, model, max_tokens, temperature)
+    resp = post_with_retry(client or _FALLBACK, openrouter_url, headers=headers(openrouter_api_key), json=payload)
+    resp.raise_for_status()
+    content = orjson.loads(resp.content)["choices"][0]["message"]["content"]
+    if cache_key is not None:
+        cache.put(cache_key, content)
+    return content
+
+
+def _stream_lines(client, url: str, headers: dict, payload: dict):
+    """Lines of a streamed POST response, from either an httpx client or a requests session.
+
+    Only the request is retried; once lines are flowing, a failure is raised to the caller.
+    """
+    resp = post_with_retry(client, url, stream=True, throttled=False, headers=headers, json=payload)
+    try:
+        resp.raise_for_status()
+        if isinstance(client, requests.Session):
+            for line in resp.iter_lines():
+                yield line.decode("utf-8")
+        else:
+            yield from resp.iter_lines()
+    finally:
+        resp.close()
+
+
+def _sse_deltas(lines):
+    """Text deltas from an OpenAI-style server-sent event stream."""
+    for line in lines:
+        # Skips the blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            choices = orjson.loads(data).get("choices") or []
+        except orjson.JSONDecodeError:
+            continue
+        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+        if delta:
+            yield delta
+
+
+def stream_model_with_system(system_prompt: str, user_content: str, *, model: str, max_tokens: int, temperature: float,
+                             openrouter_api_key: str, openrouter_url: str, on_token, client=None, cache=None) -> str:
+    """call_model_with_system with stream=True: each text delta goes to ``on_token`` as it arrives."""
+    cache_key = cache.key(model, system_prompt, user_content) if cache is not None else None
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    payload = _payload(system_prompt, user_content, model, max_tokens, temperature)
+    payload["stream"] = True
+    parts = []
+    with OPENROUTER_THROTTLE:
+        for delta in _sse_deltas(_stream_lines(client or _FALLBACK, openrouter_url, headers(openrouter_api_key), payload)):
+            parts.append(delta)
+            on_token(delta)
+    content = "".join(parts)
+    if cache_key is not None:
+        cache.put(cache_key, content)
+    return content
@@ -5,20 +5,63 @@ import uuid
 import json
 import subprocess
 import shutil
+import hashlib
+import gzip
+import heapq
+import itertools
+import queue
+import time
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from fish_audio_sdk import Session, TTSRequest
 import requests
+import httpx
+import orjson
+import yaml as yaml_lib
 import re
 from dotenv import load_dotenv
 import logging
+import functools
+from types import MappingProxyType
+from typing import Mapping
 #from sysprompt import SYSTEM_PROMPT
 from pathlib import Path
 from journal import run_journal as journal_run
 from detail import run_detail as detail_run
 from yaml_helper import run_yaml as yaml_run
-SYSTEM_PROMPT = Path(__file__).with_name("systemprompt3.md").read_text(encoding="utf-8")
+from llm_cache import DiskCache, ResponseCache
+from journal_index import JournalIndex
+from http_client import DEFAULT_TIMEOUT, UPLOAD_RETRY_METHODS, MultipartStream, make_session
+from openrouter import post_with_retry
+
+# libyaml's C loader when PyYAML was built with it; same safe semantics either way
+_YamlLoader = getattr(yaml_lib, "CSafeLoader", yaml_lib.SafeLoader)
+
+# Prompt markdown files, keyed by the name they are served under
+PROMPT_FILES = {
+    "system": "systemprompt3.md",
+    "journal": "prompt_journal.md",
+    "detail": "prompt_detail.md",
+    "yaml": "prompt_yaml.md",
+}
+
+@functools.lru_cache(maxsize=1)
+def _prompts() -> Mapping[str, str]:
+    """Read every prompt file once into a read-only mapping; missing files are left out."""
+    prompts = {}
+    for name, filename in PROMPT_FILES.items():
+        prompt_file = Path(__file__).with_name(filename)
+        if prompt_file.exists():
+            prompts[name] = prompt_file.read_bytes().decode("utf-8")
+    return MappingProxyType(prompts)
+
+SYSTEM_PROMPT = _prompts()["system"]
 
 
 # Multi-agent prompts - will be loaded dynamically from YAML
@@ -39,30 +82,19 @@ agents_storage = {
 }
 
 def _load_default_prompts():
-    """Load default prompts from markdown files at startup."""
-    global PROMPT_JOURNAL, PROMPT_DETAIL, PROMPT_YAML
+    """Load default prompts from the cached markdown files."""
+    global SYSTEM_PROMPT, PROMPT_JOURNAL, PROMPT_DETAIL, PROMPT_YAML
     
     try:
-        # Load journal prompt
-        journal_file = Path(__file__).with_name("prompt_journal.md")
-        if journal_file.exists():
-            PROMPT_JOURNAL = journal_file.read_text(encoding="utf-8")
-            dynamic_prompts["journal"] = PROMPT_JOURNAL
-            logger.info("Loaded default journal prompt")
-        
-        # Load detail prompt
-        detail_file = Path(__file__).with_name("prompt_detail.md")
-        if detail_file.exists():
-            PROMPT_DETAIL = detail_file.read_text(encoding="utf-8")
-            dynamic_prompts["detail"] = PROMPT_DETAIL
-            logger.info("Loaded default detail prompt")
-        
-        # Load YAML prompt
-        yaml_file = Path(__file__).with_name("prompt_yaml.md")
-        if yaml_file.exists():
-            PROMPT_YAML = yaml_file.read_text(encoding="utf-8")
-            dynamic_prompts["yaml"] = PROMPT_YAML
-            logger.info("Loaded default YAML prompt")
+        prompts = _prompts()
+        SYSTEM_PROMPT = prompts.get("system", SYSTEM_PROMPT)
+        PROMPT_JOURNAL = prompts.get("journal")
+        PROMPT_DETAIL = prompts.get("detail")
+        PROMPT_YAML = prompts.get("yaml")
+        for name in ("journal", "detail", "yaml"):
+            if name in prompts:
+                dynamic_prompts[name] = prompts[name]
+                logger.info(f"Loaded default {name} prompt")
             
     except Exception as e:
         logger.error(f"Error loading default prompts: {e}")
@@ -70,11 +102,31 @@ def _load_default_prompts():
 # Load environment variables
 load_dotenv()
 
+class _OrjsonProvider(DefaultJSONProvider):
+    """jsonify and request.get_json through orjson; types it cannot encode go to Flask's default hook."""
+
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=self._OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        # Hand orjson's bytes straight to the response rather than round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=self._OPTIONS), mimetype=self.mimetype)
+
 app = Flask(__name__)
-CORS(app, origins=['http://localhost:8080', 'http://127.0.0.1:8080', 'http://localhost:3000', 'http://127.0.0.1:3000'])
+app.json = _OrjsonProvider(app)
+# Flask-CORS answers every preflight itself; browsers may reuse the answer for a day
+CORS(app, origins=['http://localhost:8080', 'http://127.0.0.1:8080', 'http://localhost:3000', 'http://127.0.0.1:3000'],
+     allow_headers=['Content-Type', 'Authorization'], max_age=86400)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+# LOG_LEVEL (e.g. DEBUG, WARNING) changes verbosity without a code change
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # Load default prompts at startup
@@ -96,13 +148,11 @@ def _load_existing_agents():
         # Scan YAML files
         for yaml_file in yaml_dir.glob("*.yaml"):
             try:
-                with yaml_file.open("r", encoding="utf-8") as f:
-                    yaml_content = f.read()
+                yaml_content = yaml_file.read_bytes().decode("utf-8")
                 
                 # Parse YAML to extract agent info
                 try:
-                    import yaml as yaml_lib
-                    yaml_data = yaml_lib.safe_load(yaml_content)
+                    yaml_data = yaml_lib.load(yaml_content, Loader=_YamlLoader)
                     
                     if yaml_data and 'agent' in yaml_data:
                         agent_config = yaml_data['agent']
@@ -178,12 +228,32 @@ def _load_existing_agents():
     except Exception as e:
         logger.error(f"Error loading existing agents: {e}")
 
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write a file via a temp sibling and os.replace so readers never see a partial file."""
+    # Unique per write, so concurrent writers to the same path never share a temp file
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+# Background deployments also save agent state, so saves are serialized
+_agents_file_lock = threading.Lock()
+
 def _save_agents_to_file():
     """Save current agents storage to a JSON file for persistence."""
     try:
         agents_file = Path(__file__).parent / "agents_storage.json"
-        with agents_file.open("w", encoding="utf-8") as f:
-            json.dump(agents_storage, f, ensure_ascii=False, indent=2)
+        with _agents_file_lock:
+            # Keep the previous good copy around in case the new one is ever unreadable
+            if agents_file.exists():
+                shutil.copy2(agents_file, agents_file.with_name(agents_file.name + ".bak"))
+            _atomic_write_bytes(agents_file, orjson.dumps(agents_storage))
         logger.debug("Saved agents storage to file")
     except Exception as e:
         logger.error(f"Error saving agents storage: {e}")
@@ -192,20 +262,21 @@ def _load_agents_from_file():
     """Load agents storage from JSON file if it exists."""
     global agents_storage
     
-    try:
-        agents_file = Path(__file__).parent / "agents_storage.json"
-        if agents_file.exists():
-            with agents_file.open("r", encoding="utf-8") as f:
-                saved_storage = json.load(f)
-                if "agents" in saved_storage:
-                    agents_storage["agents"] = saved_storage["agents"]
-                    logger.info(f"Loaded {len(agents_storage['agents'])} agents from storage file")
-                else:
-                    logger.warning("Invalid agents storage file format")
-        else:
-            logger.info("No agents storage file found, will scan directories")
-    except Exception as e:
-        logger.error(f"Error loading agents storage file: {e}")
+    agents_file = Path(__file__).parent / "agents_storage.json"
+    if not agents_file.exists():
+        logger.info("No agents storage file found, will scan directories")
+        return
+    for candidate in (agents_file, agents_file.with_name(agents_file.name + ".bak")):
+        try:
+            saved_storage = orjson.loads(candidate.read_bytes())
+            if "agents" in saved_storage:
+                agents_storage["agents"] = saved_storage["agents"]
+                logger.info(f"Loaded {len(agents_storage['agents'])} agents from {candidate.name}")
+            else:
+                logger.warning("Invalid agents storage file format")
+            return
+        except Exception as e:
+            logger.error(f"Error loading agents storage file {candidate.name}: {e}")
 
 # Load existing agents at startup
 _load_agents_from_file()
@@ -219,106 +290,294 @@ try:
 except Exception as e:
     logger.error(f"Failed to create data directory {DATA_DIR}: {e}")
 
+# Listing fields of every conversation, so the journal list does not re-read every log
+JOURNAL_INDEX = JournalIndex(DATA_DIR / "index.sqlite")
+JOURNAL_PREVIEW_CHARS = 120
+
 def _journal_file_for(date: datetime) -> Path:
     return DATA_DIR / f"journal-{date.date().isoformat()}.jsonl"
 
+def _conversation_file_for(conversation_id: str) -> Path:
+    """Path of a conversation's log: the plain .jsonl, or its .jsonl.gz once compressed."""
+    conversation_file = DATA_DIR / f"conversation-{conversation_id}.jsonl"
+    if not conversation_file.exists():
+        compressed_file = conversation_file.with_name(conversation_file.name + ".gz")
+        if compressed_file.exists():
+            return compressed_file
+    return conversation_file
+
+def _is_conversation_log(name: str) -> bool:
+    return name.startswith("conversation-") and name.endswith((".jsonl", ".jsonl.gz"))
+
+def _conversation_id_from_log(name: str) -> str:
+    return name[len("conversation-"):].removesuffix(".gz").removesuffix(".jsonl")
+
+def _open_conversation(conversation_file: Path, mode: str):
+    if conversation_file.suffix == ".gz":
+        return gzip.open(conversation_file, mode)
+    return conversation_file.open(mode)
+
+def _append_conversation_records(conversation_file: Path, *records: dict) -> None:
+    """Append records to a conversation log in a single write (a new gzip member for compressed logs)."""
+    with _open_conversation(conversation_file, "ab") as f:
+        f.write(b"".join(orjson.dumps(r) + b"\n" for r in records))
+
+def _read_conversation(conversation_file: Path) -> dict:
+    """Rebuild a conversation from its append-only log.
+
+    "meta" records are merged in order (later keys win) and "message" records are
+    appended to ``messages``; a torn or corrupt line is skipped rather than
+    discarding the whole conversation.
+    """
+    conversation_data = {"messages": []}
+    with _open_conversation(conversation_file, "rb") as f:
+        try:
+            # Plain logs are read in one call; gzip logs are streamed so a truncated
+            # tail still yields the records before it
+            lines = f if conversation_file.suffix == ".gz" else f.read().splitlines()
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line in {conversation_file}")
+                    continue
+                _apply_conversation_record(conversation_data, record)
+        except EOFError:
+            logger.warning(f"Truncated compressed log {conversation_file}; using the records read so far")
+    return conversation_data
+
+def _apply_conversation_record(conversation_data: dict, record: dict) -> None:
+    record = dict(record)
+    kind = record.pop("type", None)
+    if kind == "message":
+        conversation_data["messages"].append(record)
+        conversation_data["updated_at"] = record["timestamp"]
+    elif kind == "meta":
+        conversation_data.update(record)
+
+def _migrate_legacy_conversations() -> None:
+    """Convert whole-file conversation-*.json snapshots into append-only logs."""
+    for legacy_file in DATA_DIR.glob("conversation-*.json"):
+        try:
+            with legacy_file.open("rb") as f:
+                data = orjson.loads(f.read())
+            messages = data.pop("messages", [])
+            records = [{"type": "meta", **data}, *({"type": "message", **m} for m in messages)]
+            if messages and "updated_at" in data:
+                # Keep the snapshot's updated_at, which may postdate the last message
+                records.append({"type": "meta", "updated_at": data["updated_at"]})
+            # Write the whole log at once so a crash mid-migration cannot leave a partial or duplicated log
+            _atomic_write_bytes(legacy_file.with_suffix(".jsonl"), b"".join(orjson.dumps(r) + b"\n" for r in records))
+            legacy_file.unlink()
+            logger.info(f"Migrated {legacy_file.name} to an append-only log")
+        except Exception as e:
+            logger.warning(f"Could not migrate conversation file {legacy_file}: {e}")
+
+_migrate_legacy_conversations()
+
+# Background summaries run off the request path; per-conversation locks keep their
+# appends from interleaving with the request thread's own writes
+summary_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="summary")
+_conversation_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_conversation_locks_guard = threading.Lock()
+
+def _conversation_lock(conversation_id: str) -> threading.Lock:
+    with _conversation_locks_guard:
+        lock = _conversation_locks.get(conversation_id)
+        if lock is None:
+            lock = threading.Lock()
+            _conversation_locks[conversation_id] = lock
+        return lock
+
+# Folded state of recently active conversations, so a turn does not re-read its whole log.
+# Entries are only touched while holding that conversation's lock.
+_CONV_CACHE: "OrderedDict[str, dict]" = OrderedDict()
+_CONV_CACHE_MAX = 256
+_conv_cache_lock = threading.Lock()
+
+def _cached_conversation(conversation_id: str) -> dict | None:
+    with _conv_cache_lock:
+        conversation_data = _CONV_CACHE.get(conversation_id)
+        if conversation_data is not None:
+            _CONV_CACHE.move_to_end(conversation_id)
+        return conversation_data
+
+def _cache_conversation(conversation_id: str, conversation_data: dict) -> None:
+    with _conv_cache_lock:
+        _CONV_CACHE[conversation_id] = conversation_data
+        _CONV_CACHE.move_to_end(conversation_id)
+        while len(_CONV_CACHE) > _CONV_CACHE_MAX:
+            _CONV_CACHE.popitem(last=False)
+
+def _evict_conversation(conversation_id: str) -> None:
+    with _conv_cache_lock:
+        _CONV_CACHE.pop(conversation_id, None)
+
+def _index_conversation(conversation_data: dict) -> None:
+    """Write a conversation's listing fields to the journal index; a failure is repaired on the next startup."""
+    try:
+        messages = conversation_data.get("messages", [])
+        JOURNAL_INDEX.upsert({
+            **conversation_data,
+            "n_messages": len(messages),
+            "preview": messages[0]["user_text"][:JOURNAL_PREVIEW_CHARS] if messages else "",
+        })
+    except Exception as e:
+        logger.warning(f"Could not index conversation {conversation_data.get('id')}: {e}")
+
+def _write_conversation_records(conversation_id: str, *records: dict) -> None:
+    """Append records to an existing conversation's log and keep its cached state in step."""
+    with _conversation_lock(conversation_id):
+        conversation_file = _conversation_file_for(conversation_id)
+        if not conversation_file.exists():
+            # Deleted while a background summary or title was being generated
+            return
+        _append_conversation_records(conversation_file, *records)
+        conversation_data = _cached_conversation(conversation_id)
+        if conversation_data is not None:
+            for record in records:
+                _apply_conversation_record(conversation_data, record)
+        # Only meta records come through here; the index ignores keys it has no column for
+        fields = {}
+        for record in records:
+            fields.update(record)
+        try:
+            JOURNAL_INDEX.update(conversation_id, **fields)
+        except Exception as e:
+            logger.warning(f"Could not update the journal index for {conversation_id}: {e}")
+
+# Conversation logs idle for longer than this are gzip-compressed, except the most recent few
+CONVERSATION_COMPRESS_AFTER = int(os.getenv("CONVERSATION_COMPRESS_AFTER", str(24 * 60 * 60)))
+CONVERSATION_KEEP_UNCOMPRESSED = int(os.getenv("CONVERSATION_KEEP_UNCOMPRESSED", "20"))
+
+def _compress_idle_conversations() -> None:
+    """Gzip conversation logs untouched for CONVERSATION_COMPRESS_AFTER seconds."""
+    cutoff = time.time() - CONVERSATION_COMPRESS_AFTER
+    with os.scandir(DATA_DIR) as it:
+        logs = [(e.stat().st_mtime, e.path) for e in it if e.name.startswith("conversation-") and e.name.endswith(".jsonl")]
+    # Only the newest few are exempt, so pick those out instead of sorting every log
+    keep = set(heapq.nlargest(CONVERSATION_KEEP_UNCOMPRESSED, logs))
+    for mtime, path in logs:
+        if mtime >= cutoff or (mtime, path) in keep:
+            continue
+        conversation_file = Path(path)
+        compressed_file = conversation_file.with_name(conversation_file.name + ".gz")
+        conversation_id = conversation_file.name[len("conversation-"):-len(".jsonl")]
+        try:
+            with _conversation_lock(conversation_id):
+                if compressed_file.exists():
+                    continue
+                partial_file = compressed_file.with_name(compressed_file.name + ".tmp")
+                with conversation_file.open("rb") as f_in, gzip.open(partial_file, "wb") as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+                # Keep the log's mtime so listings still order and cache by last activity
+                os.utime(partial_file, (mtime, mtime))
+                os.replace(partial_file, compressed_file)
+                conversation_file.unlink()
+            logger.info(f"Compressed idle conversation log {conversation_file.name}")
+        except Exception as e:
+            logger.warning(f"Could not compress conversation log {conversation_file}: {e}")
+
+def _schedule_conversation_compression(delay: float) -> None:
+    def run():
+        try:
+            _compress_idle_conversations()
+        finally:
+            _schedule_conversation_compression(CONVERSATION_COMPRESS_AFTER)
+    timer = threading.Timer(delay, run)
+    timer.daemon = True
+    timer.start()
+
+_schedule_conversation_compression(60)
+
+def _summary_due(message_count: int) -> bool:
+    """Summarize after the 1st message, then at 10, 20, 50, 100, 200, 500, ... messages."""
+    if message_count == 1:
+        return True
+    scale = 10
+    while scale <= message_count:
+        if message_count in (scale, 2 * scale, 5 * scale):
+            return True
+        scale *= 10
+    return False
+
+def _generate_and_persist_summary(conversation_id: str, conversation_text: str, previous_summary: str | None, message_count: int) -> None:
+    """Fold the messages since the last summary into a new summary and append it to the log."""
+    try:
+        prompt = _rolling_summary_prompt(previous_summary, conversation_text)
+        summary = _cached_llm("rolling-summary", prompt, lambda: _openrouter_complete(prompt, 80, temperature=0.7))
+        _write_conversation_records(conversation_id, {"type": "meta", "summary": summary.strip('"\''), "last_summary_at": message_count})
+        logger.info(f"Generated summary for conversation {conversation_id}")
+    except Exception as e:
+        logger.warning(f"Error generating summary for conversation {conversation_id}: {e}")
+
 def save_conversation_entry(conversation_id: str, user_text: str, ai_summary: str, extra: dict | None = None) -> dict:
-    """Save or update a conversation entry with grouped messages.
-    
-    If conversation_id exists, append to it. Otherwise, create new conversation.
+    """Append a message pair to a conversation's log, creating the log if needed.
+
+    Only the new records are written; the conversation's folded state is kept in
+    an in-memory LRU so the log is only replayed on a cache miss.
     """
-    now = datetime.now(timezone.utc)
+    now_iso = datetime.now(timezone.utc).isoformat()
     
-    # Try to find existing conversation
-    conversation_file = DATA_DIR / f"conversation-{conversation_id}.json"
+    records = []
     
-    if conversation_file.exists():
-        # Load existing conversation
-        try:
-            with conversation_file.open("r", encoding="utf-8") as f:
-                conversation_data = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            # If file is corrupted, start fresh
-            conversation_data = {
+    with _conversation_lock(conversation_id):
+        # Resolved under the lock since idle compaction may swap the file for its .gz
+        conversation_file = _conversation_file_for(conversation_id)
+        conversation_data = _cached_conversation(conversation_id)
+        if conversation_data is None and conversation_file.exists():
+            try:
+                conversation_data = _read_conversation(conversation_file)
+            except OSError as e:
+                logger.warning(f"Could not read conversation {conversation_id}: {e}")
+        if conversation_data is None or "id" not in conversation_data:
+            # Create new conversation
+            meta = {
                 "id": conversation_id,
-                "title": f"Chat {now.date().isoformat()}",
-                "created_at": now.isoformat(),
-                "updated_at": now.isoformat(),
-                "messages": []
+                "title": f"Chat {now_iso[:10]}",
+                "created_at": now_iso,
             }
-    else:
-        # Create new conversation
-        conversation_data = {
-            "id": conversation_id,
-            "title": f"Chat {now.date().isoformat()}",
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat(),
-            "messages": []
+            records.append({"type": "meta", **meta})
+            conversation_data = {**meta, "messages": []}
+        
+        # Add new message pair
+        message_id = str(uuid.uuid4())
+        message = {
+            "id": message_id,
+            "timestamp": now_iso,
+            "user_text": user_text,
+            "ai_summary": ai_summary,
+            "model": extra.get("model", "anthropic/claude-3-haiku") if extra else "anthropic/claude-3-haiku"
         }
-    
-    # Add new message pair
-    message_id = str(uuid.uuid4())
-    conversation_data["messages"].append({
-        "id": message_id,
-        "timestamp": now.isoformat(),
-        "user_text": user_text,
-        "ai_summary": ai_summary,
-        "model": extra.get("model", "anthropic/claude-3-haiku") if extra else "anthropic/claude-3-haiku"
-    })
-    
-    # Generate summary if this is the first message or if we have enough content
-    if len(conversation_data["messages"]) == 1 or len(conversation_data["messages"]) % 3 == 0:
+        conversation_data["messages"].append(message)
+        conversation_data["updated_at"] = message["timestamp"]
+        records.append({"type": "message", **message})
+        
+        # Append only the new records
         try:
-            # Build conversation text for summary
-            conversation_text = ""
-            for msg in conversation_data["messages"]:
-                conversation_text += f"User: {msg.get('user_text', '')}\n"
-                conversation_text += f"AI: {msg.get('ai_summary', '')}\n"
-            
-            if conversation_text.strip():
-                # Generate summary using the same logic as the endpoint
-                summary_prompt = f"""Based on this conversation, generate a comprehensive summary in 2-4 sentences that captures the key points, main topics discussed, and outcomes. The summary should be informative and provide a good overview of what was discussed.
-
-Conversation:
-{conversation_text.strip()}
-
-Summary:"""
-                
-                headers = {
-                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": "anthropic/claude-3-haiku",
-                    "messages": [
-                        {"role": "user", "content": summary_prompt}
-                    ],
-                    "max_tokens": 150,
-                    "temperature": 0.7
-                }
-                
-                summary_response = requests.post(OPENROUTER_URL, headers=headers, json=payload)
-                
-                if summary_response.status_code == 200:
-                    summary = summary_response.json()["choices"][0]["message"]["content"].strip()
-                    conversation_data["summary"] = summary.strip('"\'')
-                    logger.info(f"Generated summary for conversation {conversation_id}")
-                else:
-                    logger.warning(f"Failed to generate summary for conversation {conversation_id}")
+            _append_conversation_records(conversation_file, *records)
+            _cache_conversation(conversation_id, conversation_data)
+            _index_conversation(conversation_data)
+            logger.info(f"Updated conversation {conversation_id} with message {message_id}")
         except Exception as e:
-            logger.warning(f"Error generating summary for conversation {conversation_id}: {e}")
-    
-    # Update timestamp
-    conversation_data["updated_at"] = now.isoformat()
+            _evict_conversation(conversation_id)
+            logger.error(f"Failed to save conversation {conversation_id}: {e}")
+        
+        message_count = len(conversation_data["messages"])
+        # Only the messages since the last summary are sent, along with that summary
+        new_messages = conversation_data["messages"][conversation_data.get("last_summary_at", 0):]
+        previous_summary = conversation_data.get("summary")
     
-    # Save back to file
-    try:
-        with conversation_file.open("w", encoding="utf-8") as f:
-            json.dump(conversation_data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Updated conversation {conversation_id} with message {message_id}")
-    except Exception as e:
-        logger.error(f"Failed to save conversation {conversation_id}: {e}")
+    # Re-summarize at widening intervals so the number of calls grows logarithmically
+    if _summary_due(message_count):
+        # Build conversation text for summary
+        conversation_text = _conversation_text(new_messages).strip()
+        
+        if conversation_text:
+            # Summarize in the background so the response is not held up by the model call
+            summary_executor.submit(_generate_and_persist_summary, conversation_id, conversation_text, previous_summary, message_count)
     
     return conversation_data
 
@@ -341,9 +600,8 @@ def save_journal_entry(user_text: str, ai_summary: str, extra: dict | None = Non
                 entry[k] = v
     jf = _journal_file_for(now)
     try:
-        with jf.open("a", encoding="utf-8", newline="\n") as f:
-            f.write(json.dumps(entry, ensure_ascii=False))
-            f.write("\n")
+        with jf.open("ab") as f:
+            f.write(orjson.dumps(entry) + b"\n")
         logger.info(f"Appended journal entry to {jf}: {entry['id']}")
     except Exception as e:
         logger.error(f"Failed to write journal entry to {jf}: {e}")
@@ -362,31 +620,259 @@ if not OPENROUTER_API_KEY:
     logger.error("OPENROUTER_API_KEY environment variable is not set!")
     raise ValueError("OPENROUTER_API_KEY environment variable is required")
 
+class _FishSession(Session):
+    """Fish Audio SDK session with bounded waits.
+
+    The SDK already keeps one pooled httpx.Client per session (shared across threads), but builds
+    it with timeout=None, so a stalled TTS stream would hold its worker forever.
+    """
+
+    def init_sync_client(self):
+        super().init_sync_client()
+        # Same (connect, read) bounds as the requests sessions; for streamed TTS the read
+        # timeout is the longest allowed gap between audio chunks
+        self._sync_client.timeout = httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0])
+
+    def prewarm(self) -> None:
+        self._sync_client.head("/", timeout=5)
+
 try:
-    fish_session = Session(FISH_API_KEY)
+    fish_session = _FishSession(FISH_API_KEY)
     logger.info("Fish Audio session initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize Fish Audio session: {str(e)}")
     raise
 
 FISH_STT_URL = "https://api.fish.audio/v1/asr"
+
+# Keep-alive session for Fish STT uploads; the bearer header rides on the session
+FISH_HTTP = make_session(pool_size=8, retry_methods=UPLOAD_RETRY_METHODS,
+                         headers={"Authorization": f"Bearer {FISH_API_KEY}"})
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 
-# Store conversation history
-conversation_history = []
-current_conversation_id = None
-
-# Orchestrator state (single active conversation)
-orchestrator_state = {
-    "phase": None,                 # None | "detail" | "yaml"
-    "pending_questions": None,     # list[str] | None
-    "problem_brief": None,         # dict | None
-    "detail_spec": None,           # dict | None
-    "ready_yaml": None,            # str | None (stored server-side; never sent to frontend)
-    "last_question": None,         # str | None
-    "asked_questions": [],         # list[str]
-    "qa_history": [],              # list[{q,a}]
-}
+# Shared HTTP/2 client: concurrent OpenRouter calls multiplex over one TLS connection
+OPENROUTER = httpx.Client(
+    http2=True,
+    headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}", "anthropic-beta": "prompt-caching-2024-07-31"},
+    timeout=httpx.Timeout(30.0, connect=3.0),
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+
+JSON_CONTENT_TYPE = {"Content-Type": "application/json"}
+
+def _prewarm_connections():
+    """Open the Fish Audio and OpenRouter connections up front so the first request skips the handshakes."""
+    for name, warm in (("Fish Audio STT", lambda: FISH_HTTP.head("https://api.fish.audio/", timeout=5)),
+                       ("Fish Audio TTS", fish_session.prewarm),
+                       ("OpenRouter", lambda: OPENROUTER.head("https://openrouter.ai/", timeout=5))):
+        try:
+            warm()
+        except Exception as e:
+            logger.warning(f"Could not pre-warm {name} connection: {e}")
+
+threading.Thread(target=_prewarm_connections, name="prewarm", daemon=True).start()
+
+# Replies for repeated orchestrator inputs; the YAML confirmation step never calls the model
+RESPONSE_CACHE = ResponseCache(maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "512")))
+
+# Titles and summaries keyed by content hash, kept across restarts
+LLM_DISK_CACHE = DiskCache(DATA_DIR / ".llm_cache.sqlite3")
+SUMMARY_MODEL = "anthropic/claude-3-haiku"
+
+def _cached_llm(kind: str, text: str, compute) -> str:
+    """Return the cached result for (kind, text), or compute and store it."""
+    key = DiskCache.key(kind, SUMMARY_MODEL, text)
+    value = LLM_DISK_CACHE.get(key)
+    if value is None:
+        value = compute()
+        LLM_DISK_CACHE.put(key, value)
+    return value
+
+# Shared pool for OpenRouter calls that several requests may end up waiting on
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="openrouter")
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+def _inflight_key(kind: str, text: str) -> str:
+    return hashlib.blake2b(f"{kind}|{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+def _release_after(key: str, fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def _coalesced(key: str, fn, *args, **kwargs):
+    """Run fn once for all concurrent callers sharing key and hand each of them the same result."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = LLM_EXECUTOR.submit(_release_after, key, fn, *args, **kwargs)
+            _inflight[key] = future
+    return future.result()
+
+@functools.lru_cache(maxsize=16)
+def _payload_template(max_tokens: int, temperature: float, stop: tuple[str, ...] | None, system: str | None) -> bytes:
+    """Serialize everything but the prompt once per call shape; the prompt is spliced in with %."""
+    head = {"model": SUMMARY_MODEL, "max_tokens": max_tokens, "temperature": temperature}
+    if stop:
+        head["stop"] = list(stop)
+    messages = []
+    if system:
+        # Marked cacheable so Anthropic can reuse the identical system prefix across calls
+        messages.append({"role": "system", "content": [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]})
+    fixed = orjson.dumps(head)[:-1] + b',"messages":' + orjson.dumps(messages)[:-1] + (b"," if messages else b"")
+    return fixed.replace(b"%", b"%%") + b'{"role":"user","content":%s}]}'
+
+def _openrouter_complete(prompt: str, max_tokens: int, *, system: str | None = None, temperature: float = 0.0, stop: list[str] | None = None) -> str:
+    """Single-turn OpenRouter completion returning the stripped reply text.
+
+    ``system`` goes in a separate, cacheable system message. Identical concurrent prompts
+    share one in-flight request, and 429/5xx replies are retried with backoff. Raises
+    httpx.HTTPStatusError on a non-2xx reply.
+    """
+    stop_key = tuple(stop) if stop else None
+    body = _payload_template(max_tokens, temperature, stop_key, system) % orjson.dumps(prompt)
+    key = _inflight_key(f"{max_tokens}|{temperature}|{stop_key}|{system}", prompt)
+    response = _coalesced(key, post_with_retry, OPENROUTER, OPENROUTER_URL, content=body, headers=JSON_CONTENT_TYPE)
+    response.raise_for_status()
+    return orjson.loads(response.content)["choices"][0]["message"]["content"].strip()
+
+def _conversation_text(messages: list[dict]) -> str:
+    """Render message pairs as User/AI lines, joined in a single pass."""
+    return "".join(f"User: {msg.get('user_text', '')}\nAI: {msg.get('ai_summary', '')}\n" for msg in messages)
+
+# Title instructions live in the system message, identical on every call; the conversation,
+# clipped to TITLE_TEXT_LIMIT characters, is the user message
+TITLE_SYSTEM = "Generate a 3-6 word title capturing the main topic of the conversation. Reply with the title only, no quotes."
+TITLE_BATCH_SYSTEM = """For each conversation, generate a short, descriptive title (3-6 words max) that captures the main topic or theme. Return only a JSON object mapping each conversation ID to its title, like {"1": "Title", "2": "Title"}."""
+TITLE_TEXT_LIMIT = 3000
+
+def _title_text(messages: list[dict]) -> str:
+    """Conversation text for titling, built only from the messages at either end that _clip_middle can keep."""
+    budget = TITLE_TEXT_LIMIT // 2
+    head = tail = 0
+    size = 0
+    while head < len(messages) and size < budget:
+        size += len(messages[head].get("user_text", "")) + len(messages[head].get("ai_summary", ""))
+        head += 1
+    size = 0
+    while head + tail < len(messages) and size < budget:
+        size += len(messages[-1 - tail].get("user_text", "")) + len(messages[-1 - tail].get("ai_summary", ""))
+        tail += 1
+    if head + tail == len(messages):
+        return _conversation_text(messages)
+    return _conversation_text(messages[:head]) + _conversation_text(messages[len(messages) - tail:])
+
+def _clip_middle(text: str, limit: int) -> str:
+    """Keep the start and end of a long text, where the topic and its outcome usually are."""
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n...\n{text[-half:]}"
+
+def _summary_prompt(conversation_text: str) -> str:
+    return f"""Based on this conversation, generate a comprehensive summary in 2-4 sentences that captures the key points, main topics discussed, and outcomes. The summary should be informative and provide a good overview of what was discussed.
+
+Conversation:
+{conversation_text}
+
+Summary:"""
+
+def _rolling_summary_prompt(previous_summary: str | None, new_conversation_text: str) -> str:
+    if not previous_summary:
+        return _summary_prompt(new_conversation_text)
+    return f"""Here is a summary of a conversation so far, followed by the messages exchanged since. Update the summary in 2-3 sentences so it covers the key points, main topics and outcomes of the whole conversation.
+
+Summary so far:
+{previous_summary}
+
+New messages:
+{new_conversation_text}
+
+Updated summary:"""
+
+def _title_batch_prompt(conversation_texts: list[str]) -> str:
+    sections = "\n".join(f"---\nID: {n}\n{_clip_middle(text, TITLE_TEXT_LIMIT)}" for n, text in enumerate(conversation_texts, start=1))
+    return f"""{sections}
+---
+
+JSON:"""
+
+def _clean_title(title: str) -> str:
+    title = title.strip('"\'')
+    if len(title) > 50:  # Truncate if too long
+        title = title[:47] + "..."
+    return title
+
+# Conversation each client is currently talking in (used when a request names none), keyed by
+# the session id the client sends; clients that send none share the "default" slot. Session ids
+# come from clients, so only the most recently active _CURRENT_MAX are remembered
+_CURRENT_CONVERSATIONS: "OrderedDict[str, str]" = OrderedDict()
+_CURRENT_MAX = 4096
+_CURRENT_GUARD = threading.Lock()
+
+def _set_current_conversation(session_id: str, conversation_id: str) -> str | None:
+    """Make conversation_id the session's current one, returning the one it replaces."""
+    with _CURRENT_GUARD:
+        previous_id = _CURRENT_CONVERSATIONS.pop(session_id, None)
+        _CURRENT_CONVERSATIONS[session_id] = conversation_id
+        while len(_CURRENT_CONVERSATIONS) > _CURRENT_MAX:
+            _CURRENT_CONVERSATIONS.popitem(last=False)
+    return previous_id
+
+def _client_session_id(data) -> str | None:
+    """Session id from the JSON body or the sid cookie, "default" if absent, None if malformed."""
+    session_id = (data.get("session_id") if isinstance(data, dict) else None) or request.cookies.get("sid")
+    if not session_id:
+        return "default"
+    return str(session_id) if _CONVERSATION_ID_RE.fullmatch(str(session_id)) else None
+
+def _new_orchestrator_state() -> dict:
+    return {
+        "phase": None,                 # None | "detail" | "yaml"
+        "pending_questions": None,     # list[str] | None
+        "problem_brief": None,         # dict | None
+        "detail_spec": None,           # dict | None
+        "ready_yaml": None,            # str | None (stored server-side; never sent to frontend)
+        "last_question": None,         # str | None
+        "asked_questions": [],         # list[str]
+        "qa_history": [],              # list[{q,a}], the recent answers kept verbatim
+        "qa_summary": None,            # str | None, older answers folded into bullets
+    }
+
+# Per-conversation chat history and orchestrator state, each guarded by its own RLock. Conversation
+# ids come from clients, so only the most recently used _ORCH_MAX are kept; an evicted conversation
+# starts over with empty state
+_ORCH: "OrderedDict[str, dict]" = OrderedDict()
+_ORCH_MAX = 1024
+# Chat turns kept per conversation; the deque drops the oldest as new ones arrive
+HISTORY_MAX_MESSAGES = 6
+_ORCH_LOCKS: "weakref.WeakValueDictionary[str, threading.RLock]" = weakref.WeakValueDictionary()
+_ORCH_GUARD = threading.Lock()
+
+def _orchestrator_session(conversation_id: str) -> tuple[threading.RLock, dict]:
+    """Return the lock and {"history", "state"} record for a conversation, creating them if needed."""
+    with _ORCH_GUARD:
+        lock = _ORCH_LOCKS.get(conversation_id)
+        if lock is None:
+            lock = threading.RLock()
+            _ORCH_LOCKS[conversation_id] = lock
+        session = _ORCH.get(conversation_id)
+        if session is None:
+            session = {"history": deque(maxlen=HISTORY_MAX_MESSAGES), "state": _new_orchestrator_state()}
+            _ORCH[conversation_id] = session
+            while len(_ORCH) > _ORCH_MAX:
+                _ORCH.popitem(last=False)
+        else:
+            _ORCH.move_to_end(conversation_id)
+        return lock, session
+
+def _drop_orchestrator_session(conversation_id: str | None) -> None:
+    if conversation_id:
+        with _ORCH_GUARD:
+            _ORCH.pop(conversation_id, None)
 
 def _save_generated_yaml(yaml_text: str) -> str:
     """Persist generated YAML to disk and automatically create/deploy agent using yamlToFetch."""
@@ -397,20 +883,16 @@ def _save_generated_yaml(yaml_text: str) -> str:
         ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
         filename = f"agent-{ts}.yaml"
         out_path = yaml_dir / filename
-        with out_path.open("w", encoding="utf-8", newline="\n") as f:
-            f.write(yaml_text.rstrip() + "\n")
+        # Agent creation reads this file straight away, so it must never be seen half-written
+        _atomic_write_bytes(out_path, (yaml_text.rstrip() + "\n").encode("utf-8"))
         logger.info(f"Saved generated YAML to {out_path}")
         
         # Automatically create and deploy agent using yamlToFetch
         agent_info = _create_agent_from_yaml(yaml_text, str(out_path))
         if "error" not in agent_info:
             logger.info(f"Created agent: {agent_info.get('name', 'Unknown')} with ID: {agent_info.get('id')}")
-            # Auto-deploy to testnet
-            deploy_result = _deploy_agent_to_testnet(agent_info.get('id'))
-            if deploy_result.get('success'):
-                logger.info(f"Successfully deployed agent {agent_info.get('id')} to testnet")
-            else:
-                logger.warning(f"Agent deployment failed: {deploy_result.get('error')}")
+            # Auto-deploy to testnet in the background; the agent's deployment_status tracks progress
+            _start_deployment(agent_info)
         
         return str(out_path)
     except Exception as e:
@@ -425,11 +907,13 @@ def _list_generated_yamls() -> list[dict]:
             return []
         
         yaml_files = []
-        for yaml_file in yaml_dir.glob("*.yaml"):
+        with os.scandir(yaml_dir) as it:
+            yaml_entries = [e for e in it if e.name.endswith(".yaml") and e.is_file()]
+        for yaml_file in yaml_entries:
             stat = yaml_file.stat()
             yaml_files.append({
                 "filename": yaml_file.name,
-                "path": str(yaml_file),
+                "path": yaml_file.path,
                 "created": datetime.fromtimestamp(stat.st_ctime, tz=timezone.utc).isoformat(),
                 "size": stat.st_size
             })
@@ -454,8 +938,8 @@ def _create_agent_from_yaml(yaml_content: str, yaml_file_path: str) -> dict:
         agent_description = "AI agent generated from journal entry"
         
         try:
-            import yaml as yaml_lib
-            yaml_data = yaml_lib.safe_load(yaml_content)
+            # Parse the text we already have rather than re-reading the file just written
+            yaml_data = yaml_lib.load(yaml_content, Loader=_YamlLoader)
             if 'agent' in yaml_data:
                 agent_name = yaml_data['agent'].get('name', agent_name)
                 agent_description = yaml_data['agent'].get('description', agent_description)
@@ -511,6 +995,7 @@ def _create_agent_from_yaml(yaml_content: str, yaml_file_path: str) -> dict:
 
 def _deploy_agent_to_testnet(agent_id: str) -> dict:
     """Deploy an agent to Fetch.ai testnet."""
+    agent = None
     try:
         agent = next((a for a in agents_storage["agents"] if a["id"] == agent_id), None)
         if not agent:
@@ -551,8 +1036,29 @@ def _deploy_agent_to_testnet(agent_id: str) -> dict:
         
     except Exception as e:
         logger.error(f"Error deploying agent to testnet: {e}")
+        if agent:
+            agent["deployment_status"] = "failed"
+            _save_agents_to_file()
         return {"success": False, "error": str(e)}
 
+# Deployments run off the request thread; callers poll the agent's deployment_status
+DEPLOY_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deploy")
+
+def _start_deployment(agent: dict) -> Future:
+    """Mark an agent as deploying and run its testnet deployment in the background."""
+    agent["deployment_status"] = "deploying"
+    future = DEPLOY_EXECUTOR.submit(_deploy_agent_to_testnet, agent["id"])
+
+    def _log_result(done: Future) -> None:
+        result = done.result()
+        if result.get("success"):
+            logger.info(f"Successfully deployed agent {agent['id']} to testnet")
+        else:
+            logger.warning(f"Agent deployment failed: {result.get('error')}")
+
+    future.add_done_callback(_log_result)
+    return future
+
 @app.route('/agents/refresh', methods=['POST'])
 def refresh_agents():
     """Refresh the agents list by scanning YAML files again"""
@@ -648,15 +1154,13 @@ def generate_agent_from_yaml(agent_id):
 def deploy_agent(agent_id):
     """Deploy a specific agent to testnet"""
     try:
-        result = _deploy_agent_to_testnet(agent_id)
-        if result.get('success'):
-            return jsonify({
-                "status": "deployed",
-                "testnet_address": result.get('testnet_address'),
-                "agent_id": agent_id
-            })
-        else:
-            return jsonify({"error": result.get('error')}), 500
+        agent = next((a for a in agents_storage["agents"] if a["id"] == agent_id), None)
+        if not agent:
+            return jsonify({"error": "Agent not found"}), 404
+        if agent.get("deployment_status") == "deploying":
+            return jsonify({"status": "deploying", "agent_id": agent_id}), 202
+        _start_deployment(agent)
+        return jsonify({"status": "deploying", "agent_id": agent_id}), 202
     except Exception as e:
         logger.error(f"Error deploying agent: {e}")
         return jsonify({"error": str(e)}), 500
@@ -679,12 +1183,11 @@ def get_agent_details(agent_id):
                 env_file = agent_dir / ".env"
                 if env_file.exists():
                     try:
-                        with env_file.open("r", encoding="utf-8") as f:
-                            for line in f:
-                                line = line.strip()
-                                if line and not line.startswith("#") and "=" in line:
-                                    key, value = line.split("=", 1)
-                                    env_vars[key.strip()] = value.strip()
+                        for line in env_file.read_bytes().decode("utf-8").splitlines():
+                            line = line.strip()
+                            if line and not line.startswith("#") and "=" in line:
+                                key, value = line.split("=", 1)
+                                env_vars[key.strip()] = value.strip()
                     except Exception as e:
                         logger.warning(f"Error reading .env file for agent {agent_id}: {e}")
         
@@ -714,26 +1217,26 @@ def get_agent_logs(agent_id):
                 log_file = agent_dir / "agent.log"
                 if log_file.exists():
                     try:
-                        with log_file.open("r", encoding="utf-8") as f:
-                            log_lines = f.readlines()
-                            # Return last 100 lines
-                            logs = [line.strip() for line in log_lines[-100:]]
+                        log_lines = log_file.read_bytes().decode("utf-8", errors="replace").splitlines()
+                        # Return last 100 lines
+                        logs = [line.strip() for line in log_lines[-100:]]
                     except Exception as e:
                         logger.warning(f"Error reading log file for agent {agent_id}: {e}")
         
         # If no log file, return some mock logs based on agent status
         if not logs:
+            now_iso = datetime.now(timezone.utc).isoformat()
             if agent.get("status") == "deployed":
                 logs = [
-                    f"[{datetime.now(timezone.utc).isoformat()}] Agent {agent.get('name')} initialized",
-                    f"[{datetime.now(timezone.utc).isoformat()}] Agent address: {agent.get('testnet_address')}",
-                    f"[{datetime.now(timezone.utc).isoformat()}] Agent running on testnet",
-                    f"[{datetime.now(timezone.utc).isoformat()}] Monitoring active..."
+                    f"[{now_iso}] Agent {agent.get('name')} initialized",
+                    f"[{now_iso}] Agent address: {agent.get('testnet_address')}",
+                    f"[{now_iso}] Agent running on testnet",
+                    f"[{now_iso}] Monitoring active..."
                 ]
             else:
                 logs = [
-                    f"[{datetime.now(timezone.utc).isoformat()}] Agent {agent.get('name')} created",
-                    f"[{datetime.now(timezone.utc).isoformat()}] Status: {agent.get('status')}"
+                    f"[{now_iso}] Agent {agent.get('name')} created",
+                    f"[{now_iso}] Status: {agent.get('status')}"
                 ]
         
         return jsonify({
@@ -752,7 +1255,11 @@ def update_agent_env(agent_id):
         if not agent:
             return jsonify({"error": "Agent not found"}), 404
         
-        data = request.get_json()
+        if (request.content_length or 0) > MAX_JSON_BYTES:
+            return jsonify({"error": "Request too large"}), 413
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object body"}), 400
         env_vars = data.get('env_vars', {})
         
         # Get agent directory
@@ -763,9 +1270,7 @@ def update_agent_env(agent_id):
         # Write to .env file
         env_file = agent_dir / ".env"
         try:
-            with env_file.open("w", encoding="utf-8") as f:
-                for key, value in env_vars.items():
-                    f.write(f"{key}={value}\n")
+            _atomic_write_bytes(env_file, "".join(f"{key}={value}\n" for key, value in env_vars.items()).encode("utf-8"))
             logger.info(f"Updated environment variables for agent {agent_id}")
             return jsonify({
                 "status": "updated",
@@ -802,496 +1307,828 @@ def delete_agent(agent_id):
 def health_check():
     return jsonify({"status": "healthy"})
 
-@app.route('/text-to-speech', methods=['POST', 'OPTIONS'])
-def text_to_speech():
-    # Handle preflight OPTIONS request
-    if request.method == 'OPTIONS':
-        response = jsonify({})
-        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
-        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-        return response
-    
-    temp_path = None
+# Request size limits, checked against Content-Length before the body is read or parsed
+MAX_JSON_BYTES = 16 * 1024
+# Whole conversations (titles, summaries) and prompt YAML
+MAX_DOCUMENT_JSON_BYTES = 1024 * 1024
+MAX_TTS_CHARS = 2000
+MAX_AUDIO_BYTES = 25 * 1024 * 1024
+
+def _json_text_body(field: str = "text", max_bytes: int = MAX_JSON_BYTES,
+                    missing: str = "No text provided") -> tuple[dict | None, str, tuple | None]:
+    """(data, text, error_response) for the JSON endpoints that take one required text field."""
+    if (request.content_length or 0) > max_bytes:
+        return None, "", (jsonify({"error": "Request too large"}), 413)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None, "", (jsonify({"error": "Expected a JSON object body"}), 400)
+    text = data.get(field)
+    if not isinstance(text, str) or not text.strip():
+        return None, "", (jsonify({"error": missing}), 400)
+    return data, text, None
+
+# Generated speech on disk, keyed by the text and voice backend, so repeated phrases skip Fish Audio;
+# least recently used files are deleted once the directory outgrows TTS_CACHE_MAX_BYTES
+TTS_BACKEND = "s1"
+TTS_CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", str(DATA_DIR / "tts_cache")))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+TTS_CACHE_TRIM_EVERY = 50
+# Behind nginx, set to an internal location aliased to TTS_CACHE_DIR (e.g. "/internal-tts/") so cache
+# hits are sent by nginx with sendfile(2) instead of being streamed through a worker thread
+TTS_ACCEL_REDIRECT = os.getenv("TTS_ACCEL_REDIRECT", "")
+try:
+    TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+except Exception as e:
+    logger.error(f"Failed to create TTS cache directory {TTS_CACHE_DIR}: {e}")
+_tts_cache_writes = itertools.count(1)
+
+def _tts_cache_path(text: str) -> Path:
+    key = hashlib.blake2b(f"{TTS_BACKEND}|{text}".encode("utf-8"), digest_size=16).hexdigest()
+    return TTS_CACHE_DIR / f"{key}.mp3"
+
+def _cached_tts_response(cache_path: Path) -> Response | None:
+    """Response serving cached speech, or None on a miss."""
     try:
-        data = request.get_json()
-        text = data.get('text', '')
+        # Marks it recently used for eviction; a missing file is the miss, so no separate exists()
+        os.utime(cache_path)
+    except OSError:
+        return None
+    if TTS_ACCEL_REDIRECT:
+        response = Response(mimetype='audio/mpeg')
+        response.headers["X-Accel-Redirect"] = TTS_ACCEL_REDIRECT + cache_path.name
+        response.headers["Content-Disposition"] = 'inline; filename="speech.mp3"'
+    else:
+        try:
+            # No conditional/Range handling: werkzeug only applies it to GET/HEAD, and this route is POST
+            response = send_file(cache_path, mimetype='audio/mpeg', download_name="speech.mp3", conditional=False, etag=False)
+        except FileNotFoundError:
+            # Evicted since the utime
+            return None
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+def _trim_tts_cache() -> None:
+    """Delete the least recently used cached audio until the cache fits in TTS_CACHE_MAX_BYTES."""
+    try:
+        entries = []
+        with os.scandir(TTS_CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(".mp3"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+    except OSError as e:
+        logger.warning(f"Could not scan TTS cache: {e}")
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= TTS_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def _tee_tts_to_cache(chunks, cache_path: Path):
+    """Yield the audio chunks while writing them to the cache; the file only appears once the stream completed."""
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        cache_file = tmp_path.open("wb")
+    except OSError as e:
+        logger.warning("Could not cache text-to-speech audio: %s", e)
+        cache_file = None
+    complete = False
+    size = 0
+    try:
+        for chunk in chunks:
+            if cache_file is not None:
+                try:
+                    cache_file.write(chunk)
+                except OSError as e:
+                    logger.warning("Could not cache text-to-speech audio: %s", e)
+                    cache_file.close()
+                    tmp_path.unlink(missing_ok=True)
+                    cache_file = None
+            size += len(chunk)
+            yield chunk
+        complete = True
+    except Exception as e:
+        logger.error("Error while streaming text-to-speech audio: %s", e)
+    finally:
+        # Also reached when the client disconnects mid-stream; a partial file is never published
+        if cache_file is not None:
+            cache_file.close()
+            if complete and size:
+                os.replace(tmp_path, cache_path)
+                if next(_tts_cache_writes) % TTS_CACHE_TRIM_EVERY == 0:
+                    _trim_tts_cache()
+            else:
+                tmp_path.unlink(missing_ok=True)
 
-        if not text:
-            return jsonify({"error": "No text provided"}), 400
+@app.route('/text-to-speech', methods=['POST'])
+def text_to_speech():
+    try:
+        _, text, error = _json_text_body()
+        if error:
+            return error
+        # Fish rejects long inputs anyway; fail before paying for the upstream round-trip
+        if len(text) > MAX_TTS_CHARS:
+            return jsonify({"error": f"Text too long (max {MAX_TTS_CHARS} characters)"}), 413
 
         # Check if API key is available
         if not FISH_API_KEY or FISH_API_KEY == 'your_fish_audio_api_key_here':
             logger.error("FISH_AUDIO_API_KEY is not properly configured")
             return jsonify({"error": "Fish Audio API key not configured. Please set FISH_AUDIO_API_KEY environment variable."}), 500
 
-        # Create temp directory if it doesn't exist
-        temp_dir = tempfile.gettempdir()
-        os.makedirs(temp_dir, exist_ok=True)
-
-        # Generate unique filename
-        audio_id = str(uuid.uuid4())
-        temp_path = os.path.join(temp_dir, f"audio_{audio_id}.mp3")
+        # Repeated phrases are served from the cache
+        cache_path = _tts_cache_path(text)
+        response = _cached_tts_response(cache_path)
+        if response is not None:
+            logger.info("Serving cached speech for text: %.50s...", text)
+            return response
 
         # Generate speech using Fish Audio
-        logger.info(f"Generating speech for text: {text[:50]}...")
-        with open(temp_path, "wb") as f:
-            for chunk in fish_session.tts(
-                TTSRequest(text=text),
-                backend='s1'
-            ):
-                f.write(chunk)
-
-        logger.info(f"Generated audio file: {temp_path}")
-        return send_file(temp_path, mimetype='audio/mpeg')
+        logger.info("Generating speech for text: %.50s...", text)
+        chunks = iter(fish_session.tts(
+            TTSRequest(text=text),
+            backend=TTS_BACKEND
+        ))
+        # Pull the first chunk here so upstream failures still come back as a JSON error
+        first_chunk = next(chunks, b"")
+
+        # Stream chunks to the client as they arrive instead of buffering the whole file; with no
+        # Content-Length the server picks chunked encoding itself (it is hop-by-hop, so not set here)
+        return Response(_tee_tts_to_cache(itertools.chain((first_chunk,), chunks), cache_path), mimetype='audio/mpeg', headers={
+            "Cache-Control": "no-store",
+            "Content-Disposition": 'inline; filename="speech.mp3"',
+        })
 
     except Exception as e:
-        logger.error(f"Error in text-to-speech: {str(e)}")
+        logger.error("Error in text-to-speech: %s", e)
         return jsonify({"error": str(e)}), 500
-    finally:
-        # Clean up temp file after sending
-        if temp_path and os.path.exists(temp_path):
-            try:
-                # Note: We can't remove the file immediately as it's being sent
-                # The file will be cleaned up by the OS eventually
-                pass
-            except Exception as e:
-                logger.error(f"Error with temp file cleanup: {e}")
 
-@app.route('/speech-to-text', methods=['POST', 'OPTIONS'])
+@app.route('/speech-to-text', methods=['POST'])
 def speech_to_text():
-    # Handle preflight OPTIONS request
-    if request.method == 'OPTIONS':
-        response = jsonify({})
-        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
-        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-        return response
-    
-    temp_path = None
     try:
+        # Checked before request.files, which would read and spool the whole upload
+        if (request.content_length or 0) > MAX_AUDIO_BYTES:
+            return jsonify({"error": "Audio upload too large"}), 413
         if 'audio' not in request.files:
             logger.error("No audio file provided in request")
             return jsonify({"error": "No audio file provided"}), 400
 
         audio_file = request.files['audio']
-        logger.info(f"Received audio file: {audio_file.filename}, content_type: {audio_file.content_type}")
+        # Per-request lines use %-args, so nothing is formatted unless the level is enabled
+        logger.debug("Received audio file: %s, content_type: %s, request bytes: %s", audio_file.filename, audio_file.content_type, request.content_length)
 
-        # Create temp directory if it doesn't exist
-        temp_dir = tempfile.gettempdir()
-        os.makedirs(temp_dir, exist_ok=True)
-
-        # Save uploaded audio temporarily with proper extension
-        file_extension = '.webm' if 'webm' in str(audio_file.content_type) else '.wav'
-        temp_path = os.path.join(temp_dir, f"upload_{uuid.uuid4()}{file_extension}")
-        audio_file.save(temp_path)
-        
-        logger.info(f"Audio file saved with extension: {file_extension}")
-        logger.info(f"Audio file size: {os.path.getsize(temp_path)} bytes")
-        logger.info(f"Saved audio to: {temp_path}")
+        # Keep a copy of the upload on disk only when debugging; it is left in TMPDIR for inspection
+        if logger.isEnabledFor(logging.DEBUG):
+            file_extension = '.webm' if 'webm' in str(audio_file.content_type) else '.wav'
+            with tempfile.NamedTemporaryFile(prefix="upload_", suffix=file_extension, delete=False) as tf:
+                audio_file.save(tf)
+                logger.debug("Saved audio (%d bytes) to: %s", tf.tell(), tf.name)
+            audio_file.stream.seek(0)
 
         # Check if API key is available
         if not FISH_API_KEY or FISH_API_KEY == 'your_fish_audio_api_key_here':
             logger.error("FISH_AUDIO_API_KEY is not properly configured")
             return jsonify({"error": "Fish Audio API key not configured. Please set FISH_AUDIO_API_KEY environment variable."}), 500
 
-        # Use Fish Audio for speech-to-text
-        headers = {
-            "Authorization": f"Bearer {FISH_API_KEY}"
-        }
-
-        # Use Fish Audio API for speech-to-text
-        with open(temp_path, 'rb') as f:
-            files = {
-                'audio': (audio_file.filename, f, audio_file.content_type)
-            }
-            data = {
-                'language': 'en',
-                'ignore_timestamps': 'true'
-            }
-            
-            logger.info(f"Sending request to Fish Audio API: {FISH_STT_URL}")
-            stt_response = requests.post(FISH_STT_URL, headers=headers, files=files, data=data)
-            logger.info(f"Fish Audio API response status: {stt_response.status_code}")
-            logger.info(f"Fish Audio API response: {stt_response.text}")
-            
-            if stt_response.status_code != 200:
-                logger.error(f"Fish Audio API error: {stt_response.status_code} - {stt_response.text}")
-                return jsonify({"error": f"Fish Audio API error: {stt_response.status_code} - {stt_response.text}"}), 500
-            
-            stt_response.raise_for_status()
-            response_data = stt_response.json()
-            text = response_data.get('text', '')
-            logger.info(f"Transcribed: {text}")
+        # Forward the upload stream as-is: no temp file, and the multipart body is never built in memory
+        body = MultipartStream(
+            {'language': 'en', 'ignore_timestamps': 'true'},
+            'audio',
+            audio_file.filename or 'audio.webm',
+            audio_file.stream,
+            audio_file.content_type or 'audio/webm',
+        )
+        
+        stt_response = FISH_HTTP.post(FISH_STT_URL, data=body, headers={"Content-Type": body.content_type}, stream=True)
+        
+        if stt_response.status_code != 200:
+            logger.error("Fish Audio API error: %d - %s", stt_response.status_code, stt_response.text)
+            return jsonify({"error": f"Fish Audio API error: {stt_response.status_code} - {stt_response.text}"}), 500
+        
+        response_data = stt_response.json()
+        logger.debug("Fish Audio API response: %s", response_data)
+        text = response_data.get('text', '')
+        logger.info("STT ok len=%d status=%d", len(text), stt_response.status_code)
+        logger.debug("Transcribed: %s", text)
 
         return jsonify({"text": text})
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"Fish Audio API error: {str(e)}")
+        logger.error("Fish Audio API error: %s", e)
         if hasattr(e, 'response') and e.response is not None:
-            logger.error(f"Fish Audio API response: {e.response.text}")
+            logger.error("Fish Audio API response: %s", e.response.text)
         return jsonify({"error": f"Fish Audio API error: {str(e)}"}), 500
     except Exception as e:
-        logger.error(f"Error in speech-to-text: {str(e)}")
+        logger.error("Error in speech-to-text: %s", e)
         return jsonify({"error": str(e)}), 500
-    finally:
-        # Clean up temp file
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-                logger.info(f"Cleaned up temp file: {temp_path}")
-            except Exception as e:
-                logger.error(f"Error cleaning up temp file: {e}")
 
-@app.route('/conversation', methods=['POST', 'OPTIONS'])
+# Confirmation replies while a generated YAML awaits approval
+_AFFIRM = frozenset({"yes", "yep", "ok", "okay", "proceed", "generate", "sure", "deploy"})
+_NEGATE = frozenset({"no", "nope", "nah", "not", "never", "don't", "dont", "later", "stop", "cancel"})
+_AFFIRM_RE = re.compile(r"\b(?:go ahead|do it)\b")
+_WORD_RE = re.compile(r"[a-z']+")
+# Conversation ids end up in file names, so only accept uuid-like tokens from clients
+_CONVERSATION_ID_RE = re.compile(r"[A-Za-z0-9-]{1,64}")
+
+# Orchestrator phase handlers: each takes (state, user_text, on_token=None) and returns (new_state, ai_response);
+# on_token, when streaming, receives reply text as the model produces it
+
+def _handle_confirmation(state: dict, user_text: str, *, on_token=None) -> tuple[dict, str]:
+    """YAML is ready; interpret the reply as a yes/no on creating the agent."""
+    # Transcripts may use a typographic apostrophe
+    answer = user_text.strip().lower().replace("\u2019", "'")
+    words = set(_WORD_RE.findall(answer))
+    # Negation first, so "no, don't deploy" is not taken as a yes because of "deploy"
+    if not words.isdisjoint(_NEGATE):
+        return _new_orchestrator_state(), "Okay, I won't create the agent right now."
+    if not words.isdisjoint(_AFFIRM) or _AFFIRM_RE.search(answer):
+        saved_path = _save_generated_yaml(state.get("ready_yaml") or "")
+        if saved_path:
+            return _new_orchestrator_state(), "✅ Agent created and is deploying to testnet! Check the Agents panel to see your new agent."
+        return _new_orchestrator_state(), "I attempted to create and deploy the agent, but there was an error."
+    return state, "Would you like me to create and deploy the agent now? (yes/no)"
+
+# Token budgets (approximated as chars/4) for answered questions in the detail prompt: recent
+# pairs go in verbatim, and once they overflow the older half is folded into a short summary
+QA_RECENT_TOKENS = 1500
+QA_SUMMARY_TOKENS = 300
+QA_SUMMARY_SYSTEM = (
+    "Summarize the following question/answer dialogue about an agent the user wants built in at most "
+    "3 bullet points. Keep concrete requirements, names and numbers. If an earlier summary is given, "
+    "merge it in. Reply with the bullets only."
+)
+
+def _approx_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _qa_lines(qa_hist: list[dict]) -> list[str]:
+    return [f"- Q: {qa.get('q')}\n  A: {qa.get('a')}" for qa in qa_hist]
+
+def _compact_qa_history(state: dict) -> None:
+    """Fold the older half of qa_history into qa_summary once the verbatim pairs exceed QA_RECENT_TOKENS."""
+    qa_hist = state.get("qa_history") or []
+    lines = _qa_lines(qa_hist)
+    if len(lines) < 2 or sum(map(_approx_tokens, lines)) <= QA_RECENT_TOKENS:
+        return
+    half = len(lines) // 2
+    previous = state.get("qa_summary")
+    prompt = (f"Earlier summary:\n{previous}\n\n" if previous else "") + "Dialogue:\n" + "\n".join(lines[:half])
+    try:
+        # Cached on the exact text, so a retried turn does not pay for the same summary twice
+        summary = _cached_llm("qa-summary", prompt, lambda: _openrouter_complete(prompt, QA_SUMMARY_TOKENS, system=QA_SUMMARY_SYSTEM))
+    except Exception as e:
+        logger.warning("Could not summarize earlier answers: %s", e)
+        return
+    if summary:
+        state["qa_summary"] = summary
+        del qa_hist[:half]
+
+def _qa_context(state: dict) -> str:
+    """Earlier answers for the detail prompt: the running summary, then the newest pairs that fit the budget."""
+    _compact_qa_history(state)
+    lines = _qa_lines(state.get("qa_history") or [])
+    # If summarizing failed the pairs can still be over budget, so take the newest that fit
+    budget = QA_RECENT_TOKENS
+    keep = 0
+    for line in reversed(lines):
+        budget -= _approx_tokens(line)
+        if budget < 0 and keep:
+            break
+        keep += 1
+    recent = lines[len(lines) - keep:]
+    summary = state.get("qa_summary")
+    return (
+        (f"Earlier answers, summarized:\n{summary}\n" if summary else "") +
+        (f"Previously answered (last {len(recent)}):\n" + "\n".join(recent) + "\n" if recent else "")
+    )
+
+def _handle_answer(state: dict, user_text: str, *, on_token=None) -> tuple[dict, str]:
+    """Treat the reply as an answer to the pending detail or missing-info question."""
+    # Build enriched recent_user context to avoid repetition
+    last_q = state.get("last_question")
+    recent_context = (
+        (f"Previous question: {last_q}\nUser answer: {user_text}\n" if last_q else f"User answer: {user_text}\n") +
+        _qa_context(state) +
+        "Do not repeat questions already asked; proceed to the next most critical missing detail."
+    )
+    follow_up, spec = detail_run(
+        state.get("problem_brief") or {},
+        recent_context,
+        state.get("detail_spec"),
+        PROMPT_DETAIL,
+        OPENROUTER_API_KEY,
+        OPENROUTER_URL,
+        logger=logger,
+        client=OPENROUTER,
+        cache=RESPONSE_CACHE,
+    )
+    # If follow_up repeats, try once more with explicit dedupe instruction
+    if follow_up and follow_up in (state.get("asked_questions") or []):
+        alt_context = recent_context + "\nPreviously asked questions:\n" + "\n".join(state.get("asked_questions") or []) + "\nAsk a different question that was not asked before."
+        alt_follow, alt_spec = detail_run(
+            state.get("problem_brief") or {},
+            alt_context,
+            state.get("detail_spec"),
+            PROMPT_DETAIL,
+            OPENROUTER_API_KEY,
+            OPENROUTER_URL,
+            logger=logger,
+            client=OPENROUTER,
+            cache=RESPONSE_CACHE,
+        )
+        # Prefer non-duplicate alternative
+        if alt_spec:
+            spec = alt_spec
+            follow_up = None
+        elif alt_follow and alt_follow not in (state.get("asked_questions") or []):
+            follow_up = alt_follow
+    if spec:
+        state["detail_spec"] = spec
+        missing, yaml_text = yaml_run(
+            spec,
+            PROMPT_YAML,
+            OPENROUTER_API_KEY,
+            OPENROUTER_URL,
+            logger=logger,
+            client=OPENROUTER,
+            cache=RESPONSE_CACHE,
+        )
+        if yaml_text:
+            # Store YAML server-side; ask for confirmation instead of sending YAML
+            state["ready_yaml"] = yaml_text
+            state["phase"] = "yaml"
+            state["pending_questions"] = ["I have enough information to generate a YAML. Should I proceed to generate it now?"]
+            return state, state["pending_questions"][0]
+        # Avoid repeating the same missing-info question
+        if missing and missing not in (state.get("asked_questions") or []):
+            state["pending_questions"] = [missing]
+            state["last_question"] = missing
+            state["asked_questions"].append(missing)
+        else:
+            state["pending_questions"] = None
+        state["phase"] = "yaml"
+        return state, missing or "I need one more detail to finish the YAML."
+    # Track asked question and user's answer to reduce repetition
+    if state.get("last_question") and user_text:
+        state["qa_history"].append({"q": state["last_question"], "a": user_text})
+    if follow_up:
+        state["last_question"] = follow_up
+        if follow_up not in (state.get("asked_questions") or []):
+            state["asked_questions"].append(follow_up)
+    state["pending_questions"] = [follow_up] if follow_up else None
+    state["phase"] = "detail"
+    return state, follow_up or "Could you clarify a couple details?"
+
+def _handle_yaml(state: dict, user_text: str, *, on_token=None) -> tuple[dict, str]:
+    if state.get("ready_yaml"):
+        return _handle_confirmation(state, user_text, on_token=on_token)
+    return _handle_answer(state, user_text, on_token=on_token)
+
+def _handle_start(state: dict, user_text: str, *, on_token=None) -> tuple[dict, str]:
+    """No question is pending: journal the message and start a flow if it describes a problem."""
+    # Start with Journal - now returns (summary, brief, yaml)
+    journal_text, brief, yaml_content = journal_run(
+        user_text,
+        PROMPT_JOURNAL,
+        OPENROUTER_API_KEY,
+        OPENROUTER_URL,
+        logger=logger,
+        client=OPENROUTER,
+        cache=RESPONSE_CACHE,
+        on_token=on_token,
+    )
+    try:
+        # Lazy %-args: the preview is only formatted when DEBUG is on
+        logger.debug("Journal returned: brief_present=%s journal_text_len=%d journal_text_preview=%r",
+                     bool(brief), len(journal_text) if journal_text else 0, (journal_text or '')[:200])
+    except Exception:
+        pass
+    if not brief:
+        # Regular journaling - return sentence summary
+        return state, journal_text or "Noted."
+    state["problem_brief"] = brief
+    if yaml_content:
+        # YAML was generated directly - store it and ask for confirmation
+        state["ready_yaml"] = yaml_content
+        state["phase"] = "yaml"
+        state["pending_questions"] = ["I've generated an AI agent configuration for your problem. Would you like me to create and deploy it to testnet?"]
+        return state, state["pending_questions"][0]
+    # Problem detected but YAML generation needs more info - fall back to detail phase
+    follow_up, spec = detail_run(
+        brief,
+        user_text,
+        None,
+        PROMPT_DETAIL,
+        OPENROUTER_API_KEY,
+        OPENROUTER_URL,
+        logger=logger,
+        client=OPENROUTER,
+        cache=RESPONSE_CACHE,
+    )
+    if not spec:
+        state["pending_questions"] = [follow_up] if follow_up else None
+        state["phase"] = "detail"
+        return state, follow_up or "A quick question to clarify the problem."
+    state["detail_spec"] = spec
+    missing, yaml_text = yaml_run(
+        spec,
+        PROMPT_YAML,
+        OPENROUTER_API_KEY,
+        OPENROUTER_URL,
+        logger=logger,
+        client=OPENROUTER,
+        cache=RESPONSE_CACHE,
+    )
+    if yaml_text:
+        state["ready_yaml"] = yaml_text
+        state["phase"] = "yaml"
+        state["pending_questions"] = ["I have enough information to generate an agent to assist with this task. Should I create and deploy it to testnet now?"]
+        return state, state["pending_questions"][0]
+    state["pending_questions"] = [missing] if missing else None
+    state["phase"] = "yaml"
+    return state, missing or "I need one more detail to finish the YAML."
+
+# Keyed by phase; only consulted while a question is pending, otherwise every turn starts with Journal
+_PHASE_HANDLERS = {
+    "detail": _handle_answer,
+    "yaml": _handle_yaml,
+    None: _handle_start,
+}
+
+@app.route('/conversation', methods=['POST'])
 def conversation():
-    global conversation_history, current_conversation_id, orchestrator_state
-    
-    # Handle preflight OPTIONS request
-    if request.method == 'OPTIONS':
-        response = jsonify({})
-        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
-        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-        return response
-    
     try:
-        data = request.get_json()
-        user_text = data.get('text', '')
+        data, user_text, error = _json_text_body()
+        if error:
+            return error
+
+        session_id = _client_session_id(data)
+        if session_id is None:
+            return jsonify({"error": "Invalid session_id"}), 400
+
+        # Use the conversation the client names, else its current one, else start a new one
+        conversation_id = data.get('conversation_id')
+        if conversation_id is not None and not isinstance(conversation_id, str):
+            return jsonify({"error": "Invalid conversation_id"}), 400
+        if not conversation_id:
+            with _CURRENT_GUARD:
+                conversation_id = _CURRENT_CONVERSATIONS.get(session_id)
+        if conversation_id and not _CONVERSATION_ID_RE.fullmatch(conversation_id):
+            return jsonify({"error": "Invalid conversation_id"}), 400
+        if not conversation_id:
+            conversation_id = str(uuid.uuid4())
+            logger.info("Created new conversation ID: %s", conversation_id)
+        _set_current_conversation(session_id, conversation_id)
+        # {"stream": true} gets the reply as server-sent events instead of one JSON body
+        if data.get('stream'):
+            return _conversation_stream(conversation_id, user_text)
+        ai_response = _run_turn(conversation_id, user_text)
+        return jsonify({"response": ai_response, "conversation_id": conversation_id})
 
-        if not user_text:
-            return jsonify({"error": "No text provided"}), 400
+    except Exception as e:
+        logger.error("Error in conversation: %s", e)
+        return jsonify({"error": str(e)}), 500
 
-        # Create new conversation ID if none exists or if this is the first message in a conversation
-        if not current_conversation_id or len(conversation_history) == 0:
-            current_conversation_id = str(uuid.uuid4())
-            logger.info(f"Created new conversation ID: {current_conversation_id}")
-        else:
-            logger.info(f"Continuing existing conversation ID: {current_conversation_id} with {len(conversation_history)} previous messages")
+def _run_turn(conversation_id: str, user_text: str, on_token=None) -> str:
+    """Run one orchestrator turn for a conversation, record it, and return the reply."""
+    lock, session = _orchestrator_session(conversation_id)
 
-        # Add user message to conversation history
-        conversation_history.append({"role": "user", "content": user_text})
-        
-        # Safety check: ensure conversation history is clean
-        conversation_history = [msg for msg in conversation_history if isinstance(msg, dict) and "role" in msg and "content" in msg]
-
-        # Orchestrator flow
-        ai_response = ""
-        # If we have pending questions, handle answer according to current phase
-        if orchestrator_state.get("pending_questions"):
-            # Special handling: if YAML is already ready and we're awaiting confirmation
-            if orchestrator_state.get("phase") == "yaml" and orchestrator_state.get("ready_yaml"):
-                answer = user_text.strip().lower()
-                if any(x in answer for x in ["yes", "yep", "ok", "okay", "proceed", "go ahead", "generate", "do it", "sure", "deploy"]):
-                    saved_path = _save_generated_yaml(orchestrator_state.get("ready_yaml") or "")
-                    if saved_path:
-                        ai_response = "✅ Agent created and deployed to testnet! Check the Agents panel to see your new agent."
-                    else:
-                        ai_response = "I attempted to create and deploy the agent, but there was an error."
-                    orchestrator_state = {"phase": None, "pending_questions": None, "problem_brief": None, "detail_spec": None, "ready_yaml": None}
-                elif any(x in answer for x in ["no", "not now", "later", "stop", "cancel"]):
-                    ai_response = "Okay, I won't create the agent right now."
-                    orchestrator_state = {"phase": None, "pending_questions": None, "problem_brief": None, "detail_spec": None, "ready_yaml": None}
-                else:
-                    ai_response = "Would you like me to create and deploy the agent now? (yes/no)"
-                
-            else:
-            # Treat user text as answers
-                # Build enriched recent_user context to avoid repetition
-                last_q = orchestrator_state.get("last_question")
-                qa_hist = orchestrator_state.get("qa_history") or []
-                try:
-                    qa_lines = [f"- Q: {qa.get('q')}\n  A: {qa.get('a')}" for qa in qa_hist][-5:]
-                    history_block = "\n".join(qa_lines)
-                except Exception:
-                    history_block = ""
-                recent_context = (
-                    (f"Previous question: {last_q}\nUser answer: {user_text}\n" if last_q else f"User answer: {user_text}\n") +
-                    (f"Previously answered (last {len(qa_lines)}):\n{history_block}\n" if history_block else "") +
-                    "Do not repeat questions already asked; proceed to the next most critical missing detail."
-                )
-                follow_up, spec = detail_run(
-                    orchestrator_state.get("problem_brief") or {},
-                    recent_context,
-                    orchestrator_state.get("detail_spec"),
-                    PROMPT_DETAIL,
-                    OPENROUTER_API_KEY,
-                    OPENROUTER_URL,
-                    logger=logger,
-                )
-                # If follow_up repeats, try once more with explicit dedupe instruction
-                if follow_up and follow_up in (orchestrator_state.get("asked_questions") or []):
-                    alt_context = recent_context + "\nPreviously asked questions:\n" + "\n".join(orchestrator_state.get("asked_questions") or []) + "\nAsk a different question that was not asked before."
-                    alt_follow, alt_spec = detail_run(
-                        orchestrator_state.get("problem_brief") or {},
-                        alt_context,
-                        orchestrator_state.get("detail_spec"),
-                        PROMPT_DETAIL,
-                        OPENROUTER_API_KEY,
-                        OPENROUTER_URL,
-                        logger=logger,
-                    )
-                    # Prefer non-duplicate alternative
-                    if alt_spec:
-                        spec = alt_spec
-                        follow_up = None
-                    elif alt_follow and alt_follow not in (orchestrator_state.get("asked_questions") or []):
-                        follow_up = alt_follow
-                if spec:
-                    orchestrator_state["detail_spec"] = spec
-                    missing, yaml_text = yaml_run(
-                        spec,
-                        PROMPT_YAML,
-                        OPENROUTER_API_KEY,
-                        OPENROUTER_URL,
-                        logger=logger,
-                    )
-                    if yaml_text:
-                        # Store YAML server-side; ask for confirmation instead of sending YAML
-                        orchestrator_state["ready_yaml"] = yaml_text
-                        orchestrator_state["phase"] = "yaml"
-                        orchestrator_state["pending_questions"] = ["I have enough information to generate a YAML. Should I proceed to generate it now?"]
-                        ai_response = orchestrator_state["pending_questions"][0]
-                    else:
-                        # Avoid repeating the same missing-info question
-                        if missing and missing not in (orchestrator_state.get("asked_questions") or []):
-                            orchestrator_state["pending_questions"] = [missing]
-                            orchestrator_state["last_question"] = missing
-                            orchestrator_state["asked_questions"].append(missing)
-                        else:
-                            orchestrator_state["pending_questions"] = None
-                        orchestrator_state["phase"] = "yaml"
-                        ai_response = missing or "I need one more detail to finish the YAML."
-                else:
-                    # Track asked question and user's answer to reduce repetition
-                    if orchestrator_state.get("last_question") and user_text:
-                        orchestrator_state["qa_history"].append({"q": orchestrator_state["last_question"], "a": user_text})
-                    if follow_up:
-                        orchestrator_state["last_question"] = follow_up
-                        if follow_up not in (orchestrator_state.get("asked_questions") or []):
-                            orchestrator_state["asked_questions"].append(follow_up)
-                    orchestrator_state["pending_questions"] = [follow_up] if follow_up else None
-                    orchestrator_state["phase"] = "detail"
-                    ai_response = follow_up or "Could you clarify a couple details?"
-        else:
-            # Start with Journal - now returns (summary, brief, yaml)
-            journal_text, brief, yaml_content = journal_run(
-                user_text,
-                PROMPT_JOURNAL,
-                OPENROUTER_API_KEY,
-                OPENROUTER_URL,
-                logger=logger,
-            )
-            try:
-                logger.info(f"Journal returned: brief_present={bool(brief)} journal_text_len={(len(journal_text) if journal_text else 0)} journal_text_preview={repr((journal_text or '')[:200])}")
-            except Exception:
-                pass
-            if brief:
-                orchestrator_state["problem_brief"] = brief
-                if yaml_content:
-                    # YAML was generated directly - store it and ask for confirmation
-                    orchestrator_state["ready_yaml"] = yaml_content
-                    orchestrator_state["phase"] = "yaml"
-                    orchestrator_state["pending_questions"] = ["I've generated an AI agent configuration for your problem. Would you like me to create and deploy it to testnet?"]
-                    ai_response = orchestrator_state["pending_questions"][0]
-                else:
-                    # Problem detected but YAML generation needs more info - fall back to detail phase
-                    follow_up, spec = detail_run(
-                        brief,
-                        user_text,
-                        None,
-                        PROMPT_DETAIL,
-                        OPENROUTER_API_KEY,
-                        OPENROUTER_URL,
-                        logger=logger,
-                    )
-                    if spec:
-                        orchestrator_state["detail_spec"] = spec
-                        missing, yaml_text = yaml_run(
-                            spec,
-                            PROMPT_YAML,
-                            OPENROUTER_API_KEY,
-                            OPENROUTER_URL,
-                            logger=logger,
-                        )
-                        if yaml_text:
-                            orchestrator_state["ready_yaml"] = yaml_text
-                            orchestrator_state["phase"] = "yaml"
-                            orchestrator_state["pending_questions"] = ["I have enough information to generate an agent to assist with this task. Should I create and deploy it to testnet now?"]
-                            ai_response = orchestrator_state["pending_questions"][0]
-                        else:
-                            orchestrator_state["pending_questions"] = [missing] if missing else None
-                            orchestrator_state["phase"] = "yaml"
-                            ai_response = missing or "I need one more detail to finish the YAML."
-                    else:
-                        orchestrator_state["pending_questions"] = [follow_up] if follow_up else None
-                        orchestrator_state["phase"] = "detail"
-                        ai_response = follow_up or "A quick question to clarify the problem."
-            else:
-                # Regular journaling - return sentence summary
-                ai_response = journal_text or "Noted."
+    # Serialize turns within one conversation; other conversations proceed in parallel
+    with lock:
+        logger.info("Continuing conversation ID: %s with %d previous messages", conversation_id, len(session['history']))
+        conversation_history = session["history"]
+        orchestrator_state = session["state"]
 
-        # Add AI response to conversation history
+        # Orchestrator flow: a pending question is answered by its phase's handler
+        phase = orchestrator_state.get("phase") if orchestrator_state.get("pending_questions") else None
+        handler = _PHASE_HANDLERS.get(phase, _handle_answer)
+        session["state"], ai_response = handler(orchestrator_state, user_text, on_token=on_token)
+
+        # Record the turn only once it produced a reply, so a failed turn retried by the client is
+        # not appended twice (bounded, so older turns fall off)
+        conversation_history.append({"role": "user", "content": user_text})
         conversation_history.append({"role": "assistant", "content": ai_response})
 
-        # Keep conversation history manageable (last 6 messages)
-        if len(conversation_history) > 6:
-            conversation_history.pop(0)
+        logger.debug("AI Response: %s", ai_response)
+
+    # Save to grouped conversation storage
+    try:
+        save_conversation_entry(
+            conversation_id=conversation_id,
+            user_text=user_text,
+            ai_summary=ai_response,
+            extra={"model": "anthropic/claude-3-haiku"}
+        )
+    except Exception as e:
+        logger.error("Error saving conversation entry: %s", e)
+    return ai_response
+
+def _sse(event: str, payload: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
 
-        logger.info(f"AI Response: {ai_response}")
+def _conversation_stream(conversation_id: str, user_text: str) -> Response:
+    """Server-sent events for one turn: "token" events while the journal reply streams in, then one
+    "done" event with the final response (or "error"). Only "done" is authoritative; orchestrator
+    turns that ask questions or confirm YAML send no tokens."""
+    events: queue.Queue = queue.Queue()
 
-        # Save to grouped conversation storage
+    def run():
         try:
-            save_conversation_entry(
-                conversation_id=current_conversation_id,
-                user_text=user_text,
-                ai_summary=ai_response,
-                extra={"model": "anthropic/claude-3-haiku"}
-            )
+            ai_response = _run_turn(conversation_id, user_text, on_token=lambda token: events.put(_sse("token", {"token": token})))
+            events.put(_sse("done", {"response": ai_response, "conversation_id": conversation_id}))
         except Exception as e:
-            logger.error(f"Error saving conversation entry: {e}")
-        return jsonify({"response": ai_response})
+            logger.error("Error in conversation: %s", e)
+            events.put(_sse("error", {"error": str(e)}))
+        events.put(None)
 
-    except Exception as e:
-        logger.error(f"Error in conversation: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+    # The turn runs to completion (and is saved) even if the client goes away mid-stream
+    threading.Thread(target=run, name="conversation-stream", daemon=True).start()
+
+    def generate():
+        while (event := events.get()) is not None:
+            yield event
+
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
 
 @app.route('/reset-conversation', methods=['POST'])
 def reset_conversation():
-    global conversation_history, current_conversation_id
-    conversation_history = []
-    current_conversation_id = None
+    session_id = _client_session_id(request.get_json(silent=True))
+    if session_id is None:
+        return jsonify({"error": "Invalid session_id"}), 400
+    with _CURRENT_GUARD:
+        conversation_id = _CURRENT_CONVERSATIONS.pop(session_id, None)
+    _drop_orchestrator_session(conversation_id)
     return jsonify({"status": "conversation reset"})
 
 @app.route('/start-new-conversation', methods=['POST'])
 def start_new_conversation():
     """Explicitly start a new conversation with a new ID"""
-    global conversation_history, current_conversation_id
-    conversation_history = []
-    current_conversation_id = str(uuid.uuid4())
-    logger.info(f"Started new conversation with ID: {current_conversation_id}")
-    return jsonify({"status": "new conversation started", "conversation_id": current_conversation_id})
+    session_id = _client_session_id(request.get_json(silent=True))
+    if session_id is None:
+        return jsonify({"error": "Invalid session_id"}), 400
+    conversation_id = str(uuid.uuid4())
+    previous_id = _set_current_conversation(session_id, conversation_id)
+    _drop_orchestrator_session(previous_id)
+    logger.info("Started new conversation with ID: %s", conversation_id)
+    return jsonify({"status": "new conversation started", "conversation_id": conversation_id})
+
+def _is_default_title(title: str | None) -> bool:
+    return not title or title.startswith(("Journal ", "Chat "))
+
+def _journal_entry(conversation_data: dict) -> dict:
+    """Convert a folded conversation into the journal entry format."""
+    messages = []
+    for msg in conversation_data.get("messages", []):
+        messages.extend([
+            {
+                "id": f"user-{msg['id']}",
+                "sender": "user",
+                "text": msg["user_text"],
+                "timestamp": msg["timestamp"]
+            },
+            {
+                "id": f"ai-{msg['id']}",
+                "sender": "ai",
+                "text": msg["ai_summary"],
+                "timestamp": msg["timestamp"]
+            }
+        ])
+
+    # Titles still in the default format are generated later, in batches
+    title = conversation_data.get("title", "")
+    if _is_default_title(title):
+        title = f"Chat {conversation_data['created_at'][:10]}"
+
+    return {
+        "id": conversation_data["id"],
+        "title": title,
+        "timestamp": conversation_data["updated_at"],
+        "messages": messages,
+        "summary": conversation_data.get("summary", "")
+    }
+
+# Overlapping reads keeps the disk queue full on cold scans
+JOURNAL_IO_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("JOURNAL_IO_WORKERS", "16")), thread_name_prefix="journal-io")
+
+def _reindex_conversation(conversation_id: str) -> None:
+    try:
+        with _conversation_lock(conversation_id):
+            conversation_file = _conversation_file_for(conversation_id)
+            if not conversation_file.exists():
+                return
+            conversation_data = _read_conversation(conversation_file)
+            if "id" in conversation_data:
+                _index_conversation(conversation_data)
+    except (KeyError, OSError) as e:
+        logger.warning(f"Error reading conversation file for {conversation_id}: {e}")
+
+# Set once the index has caught up with the logs on disk
+_journal_index_ready = threading.Event()
+
+def _reconcile_journal_index() -> None:
+    """Index logs that are new or changed since they were last indexed, and drop rows whose log is gone.
+
+    Appends made by this process update the index as they happen, so normally only
+    migrated logs, or writes whose index update failed, are re-read here.
+    """
+    try:
+        indexed_at = JOURNAL_INDEX.indexed_at()
+        on_disk = set()
+        stale = []
+        with os.scandir(DATA_DIR) as it:
+            for dir_entry in it:
+                if not _is_conversation_log(dir_entry.name):
+                    continue
+                conversation_id = _conversation_id_from_log(dir_entry.name)
+                on_disk.add(conversation_id)
+                try:
+                    if dir_entry.stat().st_mtime > indexed_at.get(conversation_id, 0):
+                        stale.append(conversation_id)
+                except OSError as e:
+                    logger.warning(f"Error reading conversation file {dir_entry.path}: {e}")
+        list(JOURNAL_IO_EXECUTOR.map(_reindex_conversation, stale))
+        for conversation_id in indexed_at.keys() - on_disk:
+            with _conversation_lock(conversation_id):
+                if not _conversation_file_for(conversation_id).exists():
+                    JOURNAL_INDEX.delete(conversation_id)
+        logger.info(f"Journal index up to date ({len(stale)} logs re-indexed)")
+    except Exception as e:
+        logger.error(f"Failed to reconcile the journal index: {e}")
+    finally:
+        _journal_index_ready.set()
+
+threading.Thread(target=_reconcile_journal_index, daemon=True, name="journal-index").start()
+
+# Conversations titled per OpenRouter call
+TITLE_BATCH_SIZE = 20
+
+def _generate_titles_bulk(conversations: dict[str, str]) -> dict[str, str]:
+    """Title many conversations ({id: text}) with one OpenRouter call per TITLE_BATCH_SIZE; failures are left out."""
+    titles = {}
+    # Conversations whose exact text was titled before are answered from the disk cache
+    items = []
+    for conversation_id, text in conversations.items():
+        cached = LLM_DISK_CACHE.get(DiskCache.key("title", SUMMARY_MODEL, text))
+        if cached is not None:
+            titles[conversation_id] = cached
+        else:
+            items.append((conversation_id, text))
+    for i in range(0, len(items), TITLE_BATCH_SIZE):
+        batch = items[i:i + TITLE_BATCH_SIZE]
+        try:
+            reply = _openrouter_complete(_title_batch_prompt([text for _, text in batch]), 30 * len(batch), system=TITLE_BATCH_SYSTEM)
+            # Tolerate prose or a code fence around the JSON object
+            parsed = orjson.loads(reply[reply.index("{"):reply.rindex("}") + 1])
+            for n, (conversation_id, text) in enumerate(batch, start=1):
+                title = parsed.get(str(n))
+                if isinstance(title, str) and title.strip():
+                    titles[conversation_id] = _clean_title(title)
+                    LLM_DISK_CACHE.put(DiskCache.key("title", SUMMARY_MODEL, text), titles[conversation_id])
+        except Exception as e:
+            logger.warning(f"Failed to generate titles for {len(batch)} conversations: {e}")
+    return titles
+
+TITLE_BACKFILL_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="title-backfill")
+_titles_pending: set[str] = set()
+_titles_pending_lock = threading.Lock()
+
+def _title_source_text(conversation_id: str) -> str | None:
+    """The text to title a conversation from, or None if it is gone, empty or already titled."""
+    try:
+        with _conversation_lock(conversation_id):
+            conversation_data = _cached_conversation(conversation_id)
+            if conversation_data is None:
+                conversation_file = _conversation_file_for(conversation_id)
+                if not conversation_file.exists():
+                    return None
+                conversation_data = _read_conversation(conversation_file)
+            if not conversation_data["messages"] or not _is_default_title(conversation_data.get("title")):
+                return None
+            return _title_text(conversation_data["messages"]).strip() or None
+    except OSError as e:
+        logger.warning(f"Error reading conversation {conversation_id} for its title: {e}")
+        return None
+
+def _backfill_titles(conversation_ids: list[str]) -> None:
+    try:
+        texts = {}
+        for conversation_id in conversation_ids:
+            text = _title_source_text(conversation_id)
+            if text:
+                texts[conversation_id] = text
+        for conversation_id, title in _generate_titles_bulk(texts).items():
+            _write_conversation_records(conversation_id, {"type": "meta", "title": title})
+            logger.info(f"Generated and saved new title for {conversation_id}: {title}")
+    except Exception as e:
+        logger.warning(f"Title backfill failed: {e}")
+    finally:
+        with _titles_pending_lock:
+            _titles_pending.difference_update(conversation_ids)
+
+def _schedule_title_backfill(conversation_ids: list[str]) -> None:
+    """Queue title generation for conversations not already waiting on one."""
+    with _titles_pending_lock:
+        todo = [cid for cid in conversation_ids if cid not in _titles_pending]
+        _titles_pending.update(todo)
+    if todo:
+        TITLE_BACKFILL_EXECUTOR.submit(_backfill_titles, todo)
+
+# Default and largest page sizes for the journal list
+JOURNAL_PAGE_SIZE = 30
+JOURNAL_PAGE_MAX = 200
 
 @app.route('/journal-entries', methods=['GET'])
 def get_journal_entries():
-    """Get all journal entries from conversation JSON files"""
+    """List journal entries from the journal index, newest first, a page at a time.
+
+    ``cursor`` is the ``next_cursor`` of the previous page ("<updated_at>|<id>" of its last
+    entry). Messages are not included; they come from GET /journal-entries/<id>.
+    """
     try:
-        entries = []
+        limit = min(max(request.args.get("limit", JOURNAL_PAGE_SIZE, type=int), 1), JOURNAL_PAGE_MAX)
+        cursor = request.args.get("cursor") or None
+        if cursor:
+            updated_at, _, entry_id = cursor.rpartition("|")
+            if not updated_at or not _CONVERSATION_ID_RE.fullmatch(entry_id):
+                return jsonify({"error": "Invalid cursor"}), 400
+            cursor = (updated_at, entry_id)
+        
+        _journal_index_ready.wait()
+        rows = JOURNAL_INDEX.list(limit, before=cursor)
+        next_cursor = f"{rows[-1]['updated_at']}|{rows[-1]['id']}" if len(rows) == limit else None
+        
+        # Entries go out with provisional titles; real ones are backfilled in the
+        # background and show up on a later listing
+        _schedule_title_backfill([row["id"] for row in rows if _is_default_title(row["title"]) and row["n_messages"]])
+        
+        def generate():
+            # Serialized one entry at a time rather than as a whole payload
+            yield b'{"entries":['
+            for i, row in enumerate(rows):
+                title = row["title"]
+                if _is_default_title(title):
+                    title = f"Chat {(row['created_at'] or '')[:10]}"
+                entry = {
+                    "id": row["id"],
+                    "title": title,
+                    "timestamp": row["updated_at"],
+                    "summary": row["summary"] or "",
+                    "preview": row["preview"] or "",
+                    "n_messages": row["n_messages"]
+                }
+                yield (b"," if i else b"") + orjson.dumps(entry)
+            yield b'],"next_cursor":' + orjson.dumps(next_cursor) + b"}"
         
-        # Read all conversation JSON files in the data directory
-        for conversation_file in DATA_DIR.glob("conversation-*.json"):
-            try:
-                with conversation_file.open("r", encoding="utf-8") as f:
-                    conversation_data = json.load(f)
-                    
-                    # Convert conversation data to journal entry format
-                    messages = []
-                    for msg in conversation_data.get("messages", []):
-                        messages.extend([
-                            {
-                                "id": f"user-{msg['id']}",
-                                "sender": "user",
-                                "text": msg["user_text"],
-                                "timestamp": msg["timestamp"]
-                            },
-                            {
-                                "id": f"ai-{msg['id']}",
-                                "sender": "ai",
-                                "text": msg["ai_summary"],
-                                "timestamp": msg["timestamp"]
-                            }
-                        ])
-                    
-                    # Generate title if not already present or if it's the default format
-                    title = conversation_data.get("title", "")
-                    if not title or title.startswith("Journal ") or title.startswith("Chat "):
-                        # Generate a dynamic title based on conversation content
-                        conversation_text = ""
-                        for msg in conversation_data.get("messages", []):
-                            conversation_text += f"User: {msg.get('user_text', '')}\n"
-                            conversation_text += f"AI: {msg.get('ai_summary', '')}\n"
-                        
-                        if conversation_text.strip():
-                            try:
-                                title_prompt = f"""Based on this conversation, generate a short, descriptive title (3-6 words max) that captures the main topic or theme. The title should be concise and meaningful.
+        return Response(generate(), mimetype="application/json")
+        
+    except Exception as e:
+        logger.error(f"Error reading journal entries: {e}")
+        return jsonify({"error": str(e)}), 500
 
-Conversation:
-{conversation_text.strip()}
-
-Title:"""
-                                
-                                headers = {
-                                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                                    "Content-Type": "application/json"
-                                }
-                                
-                                payload = {
-                                    "model": "anthropic/claude-3-haiku",
-                                    "messages": [
-                                        {"role": "user", "content": title_prompt}
-                                    ],
-                                    "max_tokens": 20,
-                                    "temperature": 0.7
-                                }
-                                
-                                title_response = requests.post(OPENROUTER_URL, headers=headers, json=payload)
-                                
-                                if title_response.status_code == 200:
-                                    generated_title = title_response.json()["choices"][0]["message"]["content"].strip()
-                                    title = generated_title.strip('"\'')
-                                    if len(title) > 50:
-                                        title = title[:47] + "..."
-                                    
-                                    # Update the conversation file with the new title
-                                    conversation_data["title"] = title
-                                    with conversation_file.open("w", encoding="utf-8") as f:
-                                        json.dump(conversation_data, f, ensure_ascii=False, indent=2)
-                                    
-                                    logger.info(f"Generated and saved new title for {conversation_data['id']}: {title}")
-                                else:
-                                    title = f"Chat {conversation_data['created_at'][:10]}"
-                            except Exception as e:
-                                logger.warning(f"Failed to generate title for {conversation_data['id']}: {e}")
-                                title = f"Chat {conversation_data['created_at'][:10]}"
-                        else:
-                            title = f"Chat {conversation_data['created_at'][:10]}"
-                    
-                    entry = {
-                        "id": conversation_data["id"],
-                        "title": title,
-                        "timestamp": conversation_data["updated_at"],
-                        "messages": messages,
-                        "summary": conversation_data.get("summary", "")
-                    }
-                    entries.append(entry)
-                    
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.warning(f"Error reading conversation file {conversation_file}: {e}")
-                continue
+@app.route('/journal-entries/<entry_id>', methods=['GET'])
+def get_journal_entry(entry_id):
+    """Get one journal entry with its messages"""
+    try:
+        if not _CONVERSATION_ID_RE.fullmatch(entry_id):
+            return jsonify({"error": "Journal entry not found"}), 404
         
-        # Sort by timestamp (newest first)
-        entries.sort(key=lambda x: x["timestamp"], reverse=True)
+        with _conversation_lock(entry_id):
+            conversation_data = _cached_conversation(entry_id)
+            if conversation_data is None:
+                conversation_file = _conversation_file_for(entry_id)
+                if not conversation_file.exists():
+                    return jsonify({"error": "Journal entry not found"}), 404
+                conversation_data = _read_conversation(conversation_file)
+            entry = _journal_entry(conversation_data)
         
-        return jsonify({"entries": entries})
+        return jsonify({"entry": entry})
         
     except Exception as e:
-        logger.error(f"Error reading journal entries: {e}")
+        logger.error(f"Error reading journal entry {entry_id}: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/journal-entries/<entry_id>', methods=['DELETE'])
 def delete_journal_entry(entry_id):
-    """Delete a journal entry by removing the corresponding JSON file"""
+    """Delete a journal entry by removing the corresponding conversation log"""
     try:
-        # Find the conversation file for this entry ID
-        conversation_file = DATA_DIR / f"conversation-{entry_id}.json"
-        
-        if not conversation_file.exists():
-            logger.warning(f"Conversation file not found: {conversation_file}")
+        if not _CONVERSATION_ID_RE.fullmatch(entry_id):
             return jsonify({"error": "Journal entry not found"}), 404
         
-        # Delete the file
-        conversation_file.unlink()
-        logger.info(f"Deleted conversation file: {conversation_file}")
+        # Resolved under the lock, so idle compression cannot swap the .jsonl for a .gz in between
+        with _conversation_lock(entry_id):
+            conversation_file = _conversation_file_for(entry_id)
+            try:
+                conversation_file.unlink()
+            except FileNotFoundError:
+                logger.warning("Conversation file not found: %s", conversation_file)
+                return jsonify({"error": "Journal entry not found"}), 404
+            _evict_conversation(entry_id)
+            JOURNAL_INDEX.delete(entry_id)
+        logger.info("Deleted conversation file: %s", conversation_file)
         
         return jsonify({"status": "deleted", "entry_id": entry_id})
         
@@ -1303,51 +2140,16 @@ def delete_journal_entry(entry_id):
 def generate_title():
     """Generate a short title for a conversation based on its content"""
     try:
-        data = request.get_json()
-        conversation_text = data.get('text', '')
-        
-        if not conversation_text:
-            return jsonify({"error": "No conversation text provided"}), 400
-        
-        # Create a prompt for title generation
-        title_prompt = f"""Based on this conversation, generate a short, descriptive title (3-6 words max) that captures the main topic or theme. The title should be concise and meaningful.
-
-Conversation:
-{conversation_text}
-
-Title:"""
-        
-        # Use OpenRouter to generate the title
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "anthropic/claude-3-haiku",
-            "messages": [
-                {"role": "user", "content": title_prompt}
-            ],
-            "max_tokens": 20,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(OPENROUTER_URL, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            logger.error(f"OpenRouter API error for title generation: {response.status_code} - {response.text}")
-            return jsonify({"error": f"Title generation failed: {response.status_code}"}), 500
-        
-        response.raise_for_status()
-        title = response.json()["choices"][0]["message"]["content"].strip()
-        
-        # Clean up the title (remove quotes, extra whitespace, etc.)
-        title = title.strip('"\'')
-        if len(title) > 50:  # Truncate if too long
-            title = title[:47] + "..."
+        _, conversation_text, error = _json_text_body(max_bytes=MAX_DOCUMENT_JSON_BYTES, missing="No conversation text provided")
+        if error:
+            return error
         
+        title = _cached_llm("title", conversation_text, lambda: _clean_title(_openrouter_complete(_clip_middle(conversation_text, TITLE_TEXT_LIMIT), 20, system=TITLE_SYSTEM, stop=["\n"])))
         return jsonify({"title": title})
         
+    except httpx.HTTPStatusError as e:
+        logger.error(f"OpenRouter API error for title generation: {e.response.status_code} - {e.response.text}")
+        return jsonify({"error": f"Title generation failed: {e.response.status_code}"}), 500
     except Exception as e:
         logger.error(f"Error generating title: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -1356,49 +2158,16 @@ Title:"""
 def generate_summary():
     """Generate a long-form summary (2-4 sentences) for a conversation"""
     try:
-        data = request.get_json()
-        conversation_text = data.get('text', '')
+        _, conversation_text, error = _json_text_body(max_bytes=MAX_DOCUMENT_JSON_BYTES, missing="No conversation text provided")
+        if error:
+            return error
         
-        if not conversation_text:
-            return jsonify({"error": "No conversation text provided"}), 400
-        
-        # Create a prompt for summary generation
-        summary_prompt = f"""Based on this conversation, generate a comprehensive summary in 2-4 sentences that captures the key points, main topics discussed, and outcomes. The summary should be informative and provide a good overview of what was discussed.
-
-Conversation:
-{conversation_text}
-
-Summary:"""
-        
-        # Use OpenRouter to generate the summary
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "anthropic/claude-3-haiku",
-            "messages": [
-                {"role": "user", "content": summary_prompt}
-            ],
-            "max_tokens": 150,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(OPENROUTER_URL, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            logger.error(f"OpenRouter API error for summary generation: {response.status_code} - {response.text}")
-            return jsonify({"error": f"Summary generation failed: {response.status_code}"}), 500
-        
-        response.raise_for_status()
-        summary = response.json()["choices"][0]["message"]["content"].strip()
-        
-        # Clean up the summary (remove quotes, extra whitespace, etc.)
-        summary = summary.strip('"\'')
-        
-        return jsonify({"summary": summary})
+        summary = _cached_llm("summary", conversation_text, lambda: _openrouter_complete(_summary_prompt(conversation_text), 150, temperature=0.7))
+        return jsonify({"summary": summary.strip('"\'')})
         
+    except httpx.HTTPStatusError as e:
+        logger.error(f"OpenRouter API error for summary generation: {e.response.status_code} - {e.response.text}")
+        return jsonify({"error": f"Summary generation failed: {e.response.status_code}"}), 500
     except Exception as e:
         logger.error(f"Error generating summary: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -1419,15 +2188,24 @@ def get_prompts():
         logger.error(f"Error getting prompts: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/reload-prompts', methods=['POST'])
+def reload_prompts():
+    """Re-read the prompt markdown files from disk"""
+    try:
+        _prompts.cache_clear()
+        _load_default_prompts()
+        return jsonify({"success": True, "prompts": sorted(_prompts())})
+    except Exception as e:
+        logger.error(f"Error reloading prompts: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/prompts/update', methods=['POST'])
 def update_prompts():
     """Update prompts from YAML content"""
     try:
-        data = request.get_json()
-        yaml_content = data.get('yaml_content', '')
-        
-        if not yaml_content:
-            return jsonify({"error": "No YAML content provided"}), 400
+        _, yaml_content, error = _json_text_body("yaml_content", MAX_DOCUMENT_JSON_BYTES, "No YAML content provided")
+        if error:
+            return error
         
         extracted_prompts = _extract_prompts_from_yaml(yaml_content)
         
@@ -1492,4 +2270,10 @@ def delete_yaml_file(filename):
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    if os.getenv('DEV'):
+        # Local debugging only: Werkzeug's server, threaded, without the reloader or debugger
+        app.run(port=5001, threaded=True, debug=False)
+    else:
+        # Thread-pooled production server that also runs on Windows; start.sh uses gunicorn instead
+        from waitress import serve
+        serve(app, listen=os.getenv("BIND", "0.0.0.0:5001"), threads=int(os.getenv("WAITRESS_THREADS", "32")))
\ No newline at end of file
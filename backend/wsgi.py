@@ -0,0 +1,2 @@
+"""WSGI entrypoint: gunicorn -c gunicorn.conf.py wsgi:app"""
+from voice_server import app
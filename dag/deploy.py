@@ -7,11 +7,37 @@ Deploys agents to Fetch.ai testnet or mainnet with proper configuration
 import os
 import sys
 import json
-import subprocess
 import argparse
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional
-import yaml
+
+# Agent name and port as written by the code generator
+_NAME_RE = re.compile(r'name="([^"]+)"')
+_PORT_RE = re.compile(r'port=(\d+)')
+
+# Network configurations; constant, so rendered templates can be cached by network name
+NETWORKS = {
+    "testnet": {
+        "name": "testnet",
+        "rpc_url": "https://rpc-fetchhub.fetch-ai.com:443",
+        "chain_id": "fetchhub-testnet-4",
+        "explorer": "https://testnet-explorer.fetch.ai",
+        "almanac_url": "https://almanac-fetchhub.fetch-ai.com",
+        "description": "Fetch.ai Testnet"
+    },
+    "mainnet": {
+        "name": "mainnet", 
+        "rpc_url": "https://rpc-fetchhub.fetch-ai.com:443",
+        "chain_id": "fetchhub-4",
+        "explorer": "https://explore.fetch.ai",
+        "almanac_url": "https://almanac-fetchhub.fetch-ai.com",
+        "description": "Fetch.ai Mainnet"
+    }
+}
+
 
 class FetchAgentDeployer:
     def __init__(self, network: str = "testnet"):
@@ -20,50 +46,45 @@ class FetchAgentDeployer:
         self.agent_config = None
         
         # Network configurations
-        self.networks = {
-            "testnet": {
-                "name": "testnet",
-                "rpc_url": "https://rpc-fetchhub.fetch-ai.com:443",
-                "chain_id": "fetchhub-testnet-4",
-                "explorer": "https://testnet-explorer.fetch.ai",
-                "almanac_url": "https://almanac-fetchhub.fetch-ai.com",
-                "description": "Fetch.ai Testnet"
-            },
-            "mainnet": {
-                "name": "mainnet", 
-                "rpc_url": "https://rpc-fetchhub.fetch-ai.com:443",
-                "chain_id": "fetchhub-4",
-                "explorer": "https://explore.fetch.ai",
-                "almanac_url": "https://almanac-fetchhub.fetch-ai.com",
-                "description": "Fetch.ai Mainnet"
-            }
-        }
+        self.networks = NETWORKS
         
         if self.network not in self.networks:
             raise ValueError(f"Unsupported network: {network}. Supported networks: {list(self.networks.keys())}")
+        self._net = self.networks[self.network]
     
     def load_agent_config(self, agent_dir: str) -> Dict[str, Any]:
         """Load agent configuration from YAML or generated files"""
-        agent_path = Path(agent_dir)
+        # One directory pass, bucketing by name; is_file() uses the scandir entry's
+        # cached type, so non-matching files cost no extra syscalls
+        yaml_files, py_agent_files, py_files = [], [], []
+        with os.scandir(agent_dir) as it:
+            for entry in it:
+                name = entry.name
+                if not name.endswith((".yaml", ".yml", ".py")) or not entry.is_file(follow_symlinks=False):
+                    continue
+                if name.endswith((".yaml", ".yml")):
+                    yaml_files.append(entry.path)
+                elif name.endswith("_agent.py"):
+                    py_agent_files.append(entry.path)
+                else:
+                    py_files.append(entry.path)
         
         # Look for YAML config first
-        yaml_files = list(agent_path.glob("*.yaml")) + list(agent_path.glob("*.yml"))
         if yaml_files:
-            with open(yaml_files[0], 'r') as f:
-                self.agent_config = yaml.safe_load(f)
+            # Imported here so runs that never read YAML (--help, .py-only agents) skip PyYAML
+            import yaml
+            # libyaml's C loader when available; same safe semantics as yaml.safe_load
+            loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+            with open(min(yaml_files), 'r') as f:
+                self.agent_config = yaml.load(f, Loader=loader)
+        # Then a generated *_agent.py, then any Python file
+        elif py_agent_files or py_files:
+            self.agent_config = self._extract_config_from_py(Path(min(py_agent_files or py_files)))
         else:
-            # Try to load from generated Python file
-            py_files = list(agent_path.glob("*_agent.py"))
-            if not py_files:
-                # Try any Python file
-                py_files = list(agent_path.glob("*.py"))
-            
-            if py_files:
-                self.agent_config = self._extract_config_from_py(py_files[0])
-            else:
-                raise FileNotFoundError(f"No agent configuration found in {agent_dir}")
+            raise FileNotFoundError(f"No agent configuration found in {agent_dir}")
         
-        self.agent_dir = agent_dir
+        # Normalized once (no trailing separator) so file paths can be built with plain f-strings
+        self.agent_dir = os.path.normpath(agent_dir)
         return self.agent_config
     
     def _extract_config_from_py(self, py_file: Path) -> Dict[str, Any]:
@@ -72,12 +93,11 @@ class FetchAgentDeployer:
             content = f.read()
         
         # Extract agent name
-        import re
-        name_match = re.search(r'name="([^"]+)"', content)
+        name_match = _NAME_RE.search(content)
         agent_name = name_match.group(1) if name_match else "unknown_agent"
         
         # Extract port
-        port_match = re.search(r'port=(\d+)', content)
+        port_match = _PORT_RE.search(content)
         port = int(port_match.group(1)) if port_match else 8000
         
         return {
@@ -94,117 +114,187 @@ class FetchAgentDeployer:
             }
         }
     
+    def _agent_name(self, default: str) -> str:
+        return self.agent_config.get('agent', {}).get('name', default) if self.agent_config else default
+    
+    def _agent_port(self) -> int:
+        return self.agent_config.get('agent', {}).get('port', 8000) if self.agent_config else 8000
+    
+    def _env_args(self) -> tuple:
+        """(agent_name, llm) for _render_env; both None when there is nothing to put in those blocks."""
+        if not self.agent_config:
+            return None, None
+        llm = None
+        llm_config = self.agent_config.get('integrations', {}).get('llm')
+        if llm_config:
+            llm = (llm_config.get('api_key_env', 'OPENAI_API_KEY'), llm_config.get('provider'),
+                   llm_config.get('base_url', 'https://openrouter.ai/api/v1'))
+        return self._agent_name('unknown_agent'), llm
+    
+    def _path_env(self) -> str:
+        return f"{self.agent_dir}/.env.{self.network}"
+    
+    def _path_dockerfile(self) -> str:
+        return f"{self.agent_dir}/Dockerfile"
+    
+    def _path_compose(self) -> str:
+        return f"{self.agent_dir}/docker-compose.yml"
+    
+    def _path_script(self) -> str:
+        return f"{self.agent_dir}/deploy_{self.network}.sh"
+    
+    def _path_k8s(self) -> str:
+        return f"{self.agent_dir}/k8s-{self.network}.yaml"
+    
+    def _path_terraform(self) -> str:
+        return f"{self.agent_dir}/terraform-{self.network}.tf.json"
+    
+    def _retire_legacy_terraform(self) -> Optional[str]:
+        """Move aside a terraform-<network>.tf written by older versions; next to the .tf.json,
+        Terraform would load both and fail on the duplicate blocks. Returns the backup path, if any."""
+        legacy_path = f"{self.agent_dir}/terraform-{self.network}.tf"
+        backup_path = legacy_path + ".bak"
+        try:
+            os.replace(legacy_path, backup_path)
+        except FileNotFoundError:
+            return None
+        return backup_path
+    
+    @staticmethod
+    def _write_file(path: str, content: str, executable: bool = False) -> str:
+        # Raw fd writes: these files are small, so skip the buffered text-IO stack
+        data = content.encode('utf-8')
+        # Re-running setup with the same inputs leaves identical files untouched (no
+        # truncate/rewrite, so no dirtied inodes or mtime churn); a size check avoids
+        # even the read when the content has obviously changed
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            pass
+        else:
+            try:
+                st = os.fstat(fd)
+                unchanged = st.st_size == len(data) and os.read(fd, len(data)) == data
+                if unchanged and executable and st.st_mode & 0o777 != 0o755:
+                    os.fchmod(fd, 0o755)
+            finally:
+                os.close(fd)
+            if unchanged:
+                return path
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if executable:
+                os.fchmod(fd, 0o755)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        return path
+    
+    # The create_* methods write files; the _render_* static methods build their contents and are
+    # cached on their arguments, so setting up many agents does not re-render identical templates
     def create_deployment_env(self) -> str:
         """Create deployment environment file"""
-        env_content = []
-        
-        # Network configuration
-        network_config = self.networks[self.network]
-        env_content.append(f"# Fetch.ai {network_config['description']} Configuration")
-        env_content.append(f"FETCH_NETWORK={self.network}")
-        env_content.append(f"FETCH_RPC_URL={network_config['rpc_url']}")
-        env_content.append(f"FETCH_CHAIN_ID={network_config['chain_id']}")
-        env_content.append(f"FETCH_ALMANAC_URL={network_config['almanac_url']}")
-        env_content.append("")
-        
-        # Agent configuration
-        if self.agent_config:
-            agent_name = self.agent_config.get('agent', {}).get('name', 'unknown_agent')
-            env_content.append(f"# Agent Configuration")
-            env_content.append(f"AGENT_NAME={agent_name}")
-            env_content.append(f"AGENT_SEED={agent_name}_seed_{self.network}")
-            env_content.append("")
-            
-            # LLM configuration
-            if self.agent_config.get('integrations', {}).get('llm'):
-                llm_config = self.agent_config['integrations']['llm']
-                api_key_env = llm_config.get('api_key_env', 'OPENAI_API_KEY')
-                env_content.append(f"# LLM Configuration")
-                env_content.append(f"{api_key_env}=your_api_key_here")
-                
-                if llm_config.get('provider') == 'openrouter':
-                    env_content.append(f"OPENROUTER_BASE_URL={llm_config.get('base_url', 'https://openrouter.ai/api/v1')}")
-                env_content.append("")
-        
-        # Deployment configuration
-        env_content.append("# Deployment Configuration")
-        env_content.append(f"DEPLOYMENT_MODE=production")
-        env_content.append(f"ALMANAC_REGISTER=true")
-        env_content.append(f"ALMANAC_NETWORK={self.network}")
-        env_content.append("")
+        return self._write_file(self._path_env(), self._render_env(self.network, *self._env_args()))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _render_env(network: str, agent_name: Optional[str], llm: Optional[tuple]) -> str:
+        network_config = NETWORKS[network]
+        header = f"""# Fetch.ai {network_config['description']} Configuration
+FETCH_NETWORK={network}
+FETCH_RPC_URL={network_config['rpc_url']}
+FETCH_CHAIN_ID={network_config['chain_id']}
+FETCH_ALMANAC_URL={network_config['almanac_url']}
+
+"""
         
-        # Optional: Wallet configuration
-        env_content.append("# Optional: Wallet Configuration (for advanced deployments)")
-        env_content.append("# WALLET_MNEMONIC=your_wallet_mnemonic_here")
-        env_content.append("# WALLET_PASSWORD=your_wallet_password")
+        # Agent configuration, with the LLM block only when the agent has one
+        agent_block = ""
+        if agent_name is not None:
+            agent_block = f"""# Agent Configuration
+AGENT_NAME={agent_name}
+AGENT_SEED={agent_name}_seed_{network}
+
+"""
+            if llm is not None:
+                api_key_env, provider, base_url = llm
+                base_url_line = f"OPENROUTER_BASE_URL={base_url}\n" if provider == 'openrouter' else ""
+                agent_block += f"""# LLM Configuration
+{api_key_env}=your_api_key_here
+{base_url_line}
+"""
         
-        env_file = os.path.join(self.agent_dir, f".env.{self.network}")
-        with open(env_file, 'w') as f:
-            f.write('\n'.join(env_content))
+        footer = f"""# Deployment Configuration
+DEPLOYMENT_MODE=production
+ALMANAC_REGISTER=true
+ALMANAC_NETWORK={network}
+
+# Optional: Wallet Configuration (for advanced deployments)
+# WALLET_MNEMONIC=your_wallet_mnemonic_here
+# WALLET_PASSWORD=your_wallet_password"""
         
-        return env_file
+        return header + agent_block + footer
     
     def create_dockerfile(self) -> str:
         """Create Dockerfile for containerized deployment"""
-        dockerfile_content = f"""# Fetch.ai Agent Dockerfile for {self.network.title()}
-FROM python:3.9-slim
+        return self._write_file(self._path_dockerfile(), self._render_dockerfile(self.network))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _render_dockerfile(network: str) -> str:
+        return f"""# Fetch.ai Agent Dockerfile for {network.title()}
+FROM python:3.12-slim
 
 # Set working directory
 WORKDIR /app
 
-# Install system dependencies
-RUN apt-get update && apt-get install -y \\
-    curl \\
-    && rm -rf /var/lib/apt/lists/*
-
-# Copy requirements and install Python dependencies
+# Install Python dependencies and create the non-root user in one layer; the agent writes its
+# storage file into /app at runtime, so it owns the directory (the COPY below only chowns files)
 COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
+RUN pip install --no-cache-dir -r requirements.txt \\
+    && useradd -m -u 1000 agent \\
+    && chown agent:agent /app
 
 # Copy agent files
-COPY . .
-
-# Create non-root user
-RUN useradd -m -u 1000 agent && chown -R agent:agent /app
+COPY --chown=agent:agent . .
 USER agent
 
 # Expose port
 EXPOSE 8000
 
-# Health check
+# Health check (stdlib only, so the image needs no curl)
 HEALTHCHECK --interval=30s --timeout=10s --start-period=5s --retries=3 \\
-    CMD curl -f http://localhost:8000/health || exit 1
+    CMD python -c "import sys, urllib.request; sys.exit(0 if urllib.request.urlopen('http://localhost:8000/health', timeout=3).status == 200 else 1)"
 
 # Run agent
 CMD ["python", "weather_aggregator.py"]
 """
-        
-        dockerfile_path = os.path.join(self.agent_dir, "Dockerfile")
-        with open(dockerfile_path, 'w') as f:
-            f.write(dockerfile_content)
-        
-        return dockerfile_path
     
     def create_docker_compose(self) -> str:
         """Create docker-compose.yml for easy deployment"""
-        agent_name = self.agent_config.get('agent', {}).get('name', 'fetch_agent') if self.agent_config else 'fetch_agent'
-        port = self.agent_config.get('agent', {}).get('port', 8000) if self.agent_config else 8000
-        
-        compose_content = f"""version: '3.8'
+        return self._write_file(self._path_compose(), self._render_compose(self.network, self._agent_name('fetch_agent'), self._agent_port()))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _render_compose(network: str, agent_name: str, port: int) -> str:
+        network_config = NETWORKS[network]
+        return f"""version: '3.8'
 
 services:
   {agent_name}:
     build: .
-    container_name: {agent_name}_{self.network}
+    container_name: {agent_name}_{network}
     ports:
       - "{port}:8000"
     environment:
-      - FETCH_NETWORK={self.network}
-      - FETCH_RPC_URL={self.networks[self.network]['rpc_url']}
-      - FETCH_CHAIN_ID={self.networks[self.network]['chain_id']}
-      - FETCH_ALMANAC_URL={self.networks[self.network]['almanac_url']}
+      - FETCH_NETWORK={network}
+      - FETCH_RPC_URL={network_config['rpc_url']}
+      - FETCH_CHAIN_ID={network_config['chain_id']}
+      - FETCH_ALMANAC_URL={network_config['almanac_url']}
     env_file:
-      - .env.{self.network}
+      - .env.{network}
     volumes:
       - ./data:/app/data
       - ./logs:/app/logs
@@ -216,24 +306,22 @@ networks:
   fetch_network:
     driver: bridge
 """
-        
-        compose_path = os.path.join(self.agent_dir, "docker-compose.yml")
-        with open(compose_path, 'w') as f:
-            f.write(compose_content)
-        
-        return compose_path
     
     def create_deployment_script(self) -> str:
         """Create deployment script"""
-        network_config = self.networks[self.network]
-        
-        script_content = f"""#!/bin/bash
+        return self._write_file(self._path_script(), self._render_script(self.network), executable=True)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _render_script(network: str) -> str:
+        network_config = NETWORKS[network]
+        return f"""#!/bin/bash
 # Fetch.ai Agent Deployment Script for {network_config['description']}
 
 set -e
 
 echo "[DEPLOY] Deploying Fetch.ai Agent to {network_config['description']}"
-echo "Network: {self.network}"
+echo "Network: {network}"
 echo "RPC URL: {network_config['rpc_url']}"
 echo "Chain ID: {network_config['chain_id']}"
 echo ""
@@ -251,9 +339,9 @@ if ! command -v docker-compose &> /dev/null; then
 fi
 
 # Check environment file
-if [ ! -f ".env.{self.network}" ]; then
-    echo "[ERROR] Environment file .env.{self.network} not found."
-    echo "Please run: python deploy.py --network {self.network} --setup"
+if [ ! -f ".env.{network}" ]; then
+    echo "[ERROR] Environment file .env.{network} not found."
+    echo "Please run: python deploy.py --network {network} --setup"
     exit 1
 fi
 
@@ -282,251 +370,163 @@ echo "  Local: http://localhost:8000"
 echo "  Almanac: {network_config['almanac_url']}"
 echo "  Explorer: {network_config['explorer']}"
 """
-        
-        script_path = os.path.join(self.agent_dir, f"deploy_{self.network}.sh")
-        with open(script_path, 'w') as f:
-            f.write(script_content)
-        
-        # Make it executable
-        os.chmod(script_path, 0o755)
-        
-        return script_path
     
     def create_kubernetes_manifests(self) -> str:
         """Create Kubernetes deployment manifests"""
-        agent_name = self.agent_config.get('agent', {}).get('name', 'fetch_agent') if self.agent_config else 'fetch_agent'
-        port = self.agent_config.get('agent', {}).get('port', 8000) if self.agent_config else 8000
-        
-        k8s_content = f"""apiVersion: apps/v1
-kind: Deployment
-metadata:
-  name: {agent_name}-{self.network}
-  labels:
-    app: {agent_name}
-    network: {self.network}
-spec:
-  replicas: 1
-  selector:
-    matchLabels:
-      app: {agent_name}
-      network: {self.network}
-  template:
-    metadata:
-      labels:
-        app: {agent_name}
-        network: {self.network}
-    spec:
-      containers:
-      - name: {agent_name}
-        image: {agent_name}:latest
-        ports:
-        - containerPort: 8000
-        env:
-        - name: FETCH_NETWORK
-          value: "{self.network}"
-        - name: FETCH_RPC_URL
-          value: "{self.networks[self.network]['rpc_url']}"
-        - name: FETCH_CHAIN_ID
-          value: "{self.networks[self.network]['chain_id']}"
-        - name: FETCH_ALMANAC_URL
-          value: "{self.networks[self.network]['almanac_url']}"
-        envFrom:
-        - secretRef:
-            name: {agent_name}-secrets
-        resources:
-          requests:
-            memory: "256Mi"
-            cpu: "250m"
-          limits:
-            memory: "512Mi"
-            cpu: "500m"
-        livenessProbe:
-          httpGet:
-            path: /health
-            port: 8000
-          initialDelaySeconds: 30
-          periodSeconds: 10
-        readinessProbe:
-          httpGet:
-            path: /health
-            port: 8000
-          initialDelaySeconds: 5
-          periodSeconds: 5
----
-apiVersion: v1
-kind: Service
-metadata:
-  name: {agent_name}-service
-  labels:
-    app: {agent_name}
-    network: {self.network}
-spec:
-  selector:
-    app: {agent_name}
-    network: {self.network}
-  ports:
-  - port: 80
-    targetPort: 8000
-    protocol: TCP
-  type: ClusterIP
----
-apiVersion: v1
-kind: Secret
-metadata:
-  name: {agent_name}-secrets
-type: Opaque
-stringData:
-  OPENROUTER_API_KEY: "your_api_key_here"
-  # Add other secrets as needed
-"""
-        
-        k8s_path = os.path.join(self.agent_dir, f"k8s-{self.network}.yaml")
-        with open(k8s_path, 'w') as f:
-            f.write(k8s_content)
-        
-        return k8s_path
+        return self._write_file(self._path_k8s(), self._render_k8s(self.network, self._agent_name('fetch_agent')))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _render_k8s(network: str, agent_name: str) -> str:
+        # Built as data and dumped once, so names and URLs are quoted by the emitter, not by hand
+        import yaml
+        network_config = NETWORKS[network]
+        labels = {'app': agent_name, 'network': network}
+        probe = {'httpGet': {'path': '/health', 'port': 8000}}
+        deployment = {
+            'apiVersion': 'apps/v1',
+            'kind': 'Deployment',
+            'metadata': {'name': f"{agent_name}-{network}", 'labels': labels},
+            'spec': {
+                'replicas': 1,
+                'selector': {'matchLabels': labels},
+                'template': {
+                    'metadata': {'labels': labels},
+                    'spec': {
+                        'containers': [{
+                            'name': agent_name,
+                            'image': f"{agent_name}:latest",
+                            'ports': [{'containerPort': 8000}],
+                            'env': [
+                                {'name': 'FETCH_NETWORK', 'value': network},
+                                {'name': 'FETCH_RPC_URL', 'value': network_config['rpc_url']},
+                                {'name': 'FETCH_CHAIN_ID', 'value': network_config['chain_id']},
+                                {'name': 'FETCH_ALMANAC_URL', 'value': network_config['almanac_url']},
+                            ],
+                            'envFrom': [{'secretRef': {'name': f"{agent_name}-secrets"}}],
+                            'resources': {
+                                'requests': {'memory': '256Mi', 'cpu': '250m'},
+                                'limits': {'memory': '512Mi', 'cpu': '500m'},
+                            },
+                            'livenessProbe': {**probe, 'initialDelaySeconds': 30, 'periodSeconds': 10},
+                            'readinessProbe': {**probe, 'initialDelaySeconds': 5, 'periodSeconds': 5},
+                        }],
+                    },
+                },
+            },
+        }
+        service = {
+            'apiVersion': 'v1',
+            'kind': 'Service',
+            'metadata': {'name': f"{agent_name}-service", 'labels': labels},
+            'spec': {
+                'selector': labels,
+                'ports': [{'port': 80, 'targetPort': 8000, 'protocol': 'TCP'}],
+                'type': 'ClusterIP',
+            },
+        }
+        secret = {
+            'apiVersion': 'v1',
+            'kind': 'Secret',
+            'metadata': {'name': f"{agent_name}-secrets"},
+            'type': 'Opaque',
+            'stringData': {'OPENROUTER_API_KEY': 'your_api_key_here'},
+        }
+        # libyaml's C emitter when available; same output rules as yaml.safe_dump_all, but the
+        # shared labels/probe dicts are written out in full rather than as &id001 anchors
+        class Dumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+            def ignore_aliases(self, data):
+                return True
+        return yaml.dump_all([deployment, service, secret], Dumper=Dumper, sort_keys=False, default_flow_style=False)
     
     def create_terraform_config(self) -> str:
         """Create Terraform configuration for cloud deployment"""
-        agent_name = self.agent_config.get('agent', {}).get('name', 'fetch_agent') if self.agent_config else 'fetch_agent'
-        
-        terraform_content = f"""# Terraform configuration for Fetch.ai Agent on {self.network.title()}
-terraform {{
-  required_providers {{
-    aws = {{
-      source  = "hashicorp/aws"
-      version = "~> 5.0"
-    }}
-  }}
-}}
-
-provider "aws" {{
-  region = "us-east-1"
-}}
-
-# VPC and networking
-resource "aws_vpc" "fetch_vpc" {{
-  cidr_block           = "10.0.0.0/16"
-  enable_dns_hostnames = true
-  enable_dns_support   = true
-
-  tags = {{
-    Name = "fetch-agent-vpc"
-    Network = "{self.network}"
-  }}
-}}
-
-resource "aws_subnet" "fetch_subnet" {{
-  vpc_id            = aws_vpc.fetch_vpc.id
-  cidr_block        = "10.0.1.0/24"
-  availability_zone = "us-east-1a"
-
-  tags = {{
-    Name = "fetch-agent-subnet"
-  }}
-}}
-
-resource "aws_internet_gateway" "fetch_gw" {{
-  vpc_id = aws_vpc.fetch_vpc.id
-
-  tags = {{
-    Name = "fetch-agent-gateway"
-  }}
-}}
-
-resource "aws_route_table" "fetch_rt" {{
-  vpc_id = aws_vpc.fetch_vpc.id
-
-  route {{
-    cidr_block = "0.0.0.0/0"
-    gateway_id = aws_internet_gateway.fetch_gw.id
-  }}
-
-  tags = {{
-    Name = "fetch-agent-route-table"
-  }}
-}}
-
-resource "aws_route_table_association" "fetch_rta" {{
-  subnet_id      = aws_subnet.fetch_subnet.id
-  route_table_id = aws_route_table.fetch_rt.id
-}}
-
-# Security group
-resource "aws_security_group" "fetch_sg" {{
-  name_prefix = "fetch-agent-sg"
-  vpc_id      = aws_vpc.fetch_vpc.id
-
-  ingress {{
-    from_port   = 8000
-    to_port     = 8000
-    protocol    = "tcp"
-    cidr_blocks = ["0.0.0.0/0"]
-  }}
-
-  ingress {{
-    from_port   = 22
-    to_port     = 22
-    protocol    = "tcp"
-    cidr_blocks = ["0.0.0.0/0"]
-  }}
-
-  egress {{
-    from_port   = 0
-    to_port     = 0
-    protocol    = "-1"
-    cidr_blocks = ["0.0.0.0/0"]
-  }}
-
-  tags = {{
-    Name = "fetch-agent-security-group"
-  }}
-}}
-
-# EC2 instance
-resource "aws_instance" "fetch_agent" {{
-  ami                    = "ami-0c02fb55956c7d316"  # Ubuntu 20.04 LTS
-  instance_type          = "t3.micro"
-  subnet_id              = aws_subnet.fetch_subnet.id
-  vpc_security_group_ids = [aws_security_group.fetch_sg.id]
-  key_name               = "your-key-pair"  # Replace with your key pair
-
-  user_data = <<-EOF
-    #!/bin/bash
-    apt-get update
-    apt-get install -y docker.io docker-compose git
-    systemctl start docker
-    systemctl enable docker
-    usermod -aG docker ubuntu
+        backup_path = self._retire_legacy_terraform()
+        if backup_path:
+            print(f"[OK] Moved the old Terraform configuration to {backup_path}")
+        return self._write_file(self._path_terraform(), self._render_terraform(self.network, self._agent_name('fetch_agent')))
     
-    # Clone and deploy agent
-    git clone <your-repo-url> /home/ubuntu/agent
-    cd /home/ubuntu/agent
-    chmod +x deploy_{self.network}.sh
-    ./deploy_{self.network}.sh
-  EOF
-
-  tags = {{
-    Name = "{agent_name}-{self.network}"
-    Network = "{self.network}"
-  }}
-}}
-
-# Output
-output "agent_public_ip" {{
-  value = aws_instance.fetch_agent.public_ip
-}}
-
-output "agent_url" {{
-  value = "http://${{aws_instance.fetch_agent.public_ip}}:8000"
-}}
-"""
-        
-        terraform_path = os.path.join(self.agent_dir, f"terraform-{self.network}.tf")
-        with open(terraform_path, 'w') as f:
-            f.write(terraform_content)
-        
-        return terraform_path
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _render_terraform(network: str, agent_name: str) -> str:
+        # Terraform reads .tf.json natively, so the config is plain data; references use ${...} interpolation
+        open_cidr = ["0.0.0.0/0"]
+        # JSON gives no block defaults for security group rules, so every field is spelled out
+        rule = {'description': None, 'ipv6_cidr_blocks': [], 'prefix_list_ids': [], 'security_groups': [], 'self': False}
+        user_data = "\n".join([
+            "#!/bin/bash",
+            "apt-get update",
+            "apt-get install -y docker.io docker-compose git",
+            "systemctl start docker",
+            "systemctl enable docker",
+            "usermod -aG docker ubuntu",
+            "",
+            "# Clone and deploy agent",
+            "git clone <your-repo-url> /home/ubuntu/agent",
+            "cd /home/ubuntu/agent",
+            f"chmod +x deploy_{network}.sh",
+            f"./deploy_{network}.sh",
+            "",
+        ])
+        config = {
+            '//': f"Terraform configuration for Fetch.ai Agent on {network.title()}",
+            'terraform': {'required_providers': {'aws': {'source': 'hashicorp/aws', 'version': '~> 5.0'}}},
+            'provider': {'aws': {'region': 'us-east-1'}},
+            'resource': {
+                'aws_vpc': {'fetch_vpc': {
+                    'cidr_block': '10.0.0.0/16',
+                    'enable_dns_hostnames': True,
+                    'enable_dns_support': True,
+                    'tags': {'Name': 'fetch-agent-vpc', 'Network': network},
+                }},
+                'aws_subnet': {'fetch_subnet': {
+                    'vpc_id': '${aws_vpc.fetch_vpc.id}',
+                    'cidr_block': '10.0.1.0/24',
+                    'availability_zone': 'us-east-1a',
+                    'tags': {'Name': 'fetch-agent-subnet'},
+                }},
+                'aws_internet_gateway': {'fetch_gw': {
+                    'vpc_id': '${aws_vpc.fetch_vpc.id}',
+                    'tags': {'Name': 'fetch-agent-gateway'},
+                }},
+                'aws_route_table': {'fetch_rt': {
+                    'vpc_id': '${aws_vpc.fetch_vpc.id}',
+                    'route': [{'cidr_block': '0.0.0.0/0', 'gateway_id': '${aws_internet_gateway.fetch_gw.id}'}],
+                    'tags': {'Name': 'fetch-agent-route-table'},
+                }},
+                'aws_route_table_association': {'fetch_rta': {
+                    'subnet_id': '${aws_subnet.fetch_subnet.id}',
+                    'route_table_id': '${aws_route_table.fetch_rt.id}',
+                }},
+                'aws_security_group': {'fetch_sg': {
+                    'name_prefix': 'fetch-agent-sg',
+                    'vpc_id': '${aws_vpc.fetch_vpc.id}',
+                    'ingress': [
+                        {**rule, 'from_port': 8000, 'to_port': 8000, 'protocol': 'tcp', 'cidr_blocks': open_cidr},
+                        {**rule, 'from_port': 22, 'to_port': 22, 'protocol': 'tcp', 'cidr_blocks': open_cidr},
+                    ],
+                    'egress': [
+                        {**rule, 'from_port': 0, 'to_port': 0, 'protocol': '-1', 'cidr_blocks': open_cidr},
+                    ],
+                    'tags': {'Name': 'fetch-agent-security-group'},
+                }},
+                'aws_instance': {'fetch_agent': {
+                    '//': "ami is Ubuntu 20.04 LTS; replace key_name with your key pair",
+                    'ami': 'ami-0c02fb55956c7d316',
+                    'instance_type': 't3.micro',
+                    'subnet_id': '${aws_subnet.fetch_subnet.id}',
+                    'vpc_security_group_ids': ['${aws_security_group.fetch_sg.id}'],
+                    'key_name': 'your-key-pair',
+                    'user_data': user_data,
+                    'tags': {'Name': f"{agent_name}-{network}", 'Network': network},
+                }},
+            },
+            'output': {
+                'agent_public_ip': {'value': '${aws_instance.fetch_agent.public_ip}'},
+                'agent_url': {'value': 'http://${aws_instance.fetch_agent.public_ip}:8000'},
+            },
+        }
+        return json.dumps(config, indent=2) + "\n"
     
     def setup_deployment(self) -> Dict[str, str]:
         """Setup complete deployment configuration"""
@@ -535,63 +535,66 @@ output "agent_url" {{
         
         print(f"[SETUP] Setting up deployment for {self.network.title()}...")
         
+        # Render up front; the pool only does the writes, which are independent of each other
+        agent_name = self._agent_name('fetch_agent')
+        jobs = [
+            ('env', "environment file", self._path_env(), self._render_env(self.network, *self._env_args()), False),
+            ('dockerfile', "Dockerfile", self._path_dockerfile(), self._render_dockerfile(self.network), False),
+            ('compose', "docker-compose.yml", self._path_compose(), self._render_compose(self.network, agent_name, self._agent_port()), False),
+            ('script', "deployment script", self._path_script(), self._render_script(self.network), True),
+            ('k8s', "Kubernetes manifests", self._path_k8s(), self._render_k8s(self.network, agent_name), False),
+            ('terraform', "Terraform configuration", self._path_terraform(), self._render_terraform(self.network, agent_name), False),
+        ]
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [executor.submit(self._write_file, path, content, executable) for _, _, path, content, executable in jobs]
+        
+        # One write for the status lines when piped (CI logs); a terminal still gets them line by line
+        interactive = sys.stdout.isatty()
         files_created = {}
-        
-        # Create environment file
-        env_file = self.create_deployment_env()
-        files_created['env'] = env_file
-        print(f"[OK] Created environment file: {env_file}")
-        
-        # Create Dockerfile
-        dockerfile = self.create_dockerfile()
-        files_created['dockerfile'] = dockerfile
-        print(f"[OK] Created Dockerfile: {dockerfile}")
-        
-        # Create docker-compose
-        compose_file = self.create_docker_compose()
-        files_created['compose'] = compose_file
-        print(f"[OK] Created docker-compose.yml: {compose_file}")
-        
-        # Create deployment script
-        deploy_script = self.create_deployment_script()
-        files_created['script'] = deploy_script
-        print(f"[OK] Created deployment script: {deploy_script}")
-        
-        # Create Kubernetes manifests
-        k8s_file = self.create_kubernetes_manifests()
-        files_created['k8s'] = k8s_file
-        print(f"[OK] Created Kubernetes manifests: {k8s_file}")
-        
-        # Create Terraform configuration
-        terraform_file = self.create_terraform_config()
-        files_created['terraform'] = terraform_file
-        print(f"[OK] Created Terraform configuration: {terraform_file}")
+        lines = []
+        for (key, label, _, _, _), future in zip(jobs, futures):
+            files_created[key] = future.result()
+            line = f"[OK] Created {label}: {files_created[key]}"
+            if interactive:
+                print(line)
+            else:
+                lines.append(line)
+        backup_path = self._retire_legacy_terraform()
+        if backup_path:
+            line = f"[OK] Moved the old Terraform configuration to {backup_path} (replaced by the .tf.json)"
+            if interactive:
+                print(line)
+            else:
+                lines.append(line)
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
         
         return files_created
     
     def deploy_local(self) -> bool:
         """Deploy agent locally using docker-compose"""
+        import subprocess
+        
         try:
             print(f"[DEPLOY] Deploying agent locally to {self.network.title()}...")
             
-            # Change to agent directory
-            os.chdir(self.agent_dir)
-            
-            # Run deployment script
-            deploy_script = f"deploy_{self.network}.sh"
-            if os.path.exists(deploy_script):
-                result = subprocess.run([f"./{deploy_script}"], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
+            # Run deployment script from the agent directory; cwd= applies to the child
+            # only, so concurrent deployers in this process are unaffected
+            deploy_script = self._path_script()
+            if os.access(deploy_script, os.X_OK):
+                # Echo the docker build/compose output as it arrives rather than holding it all
+                with subprocess.Popen([os.path.abspath(deploy_script)], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                      text=True, bufsize=1, cwd=self.agent_dir) as proc:
+                    for line in proc.stdout:
+                        print(line, end='')
+                if proc.returncode == 0:
                     print("[OK] Agent deployed successfully!")
-                    print(result.stdout)
                     return True
                 else:
                     print("[ERROR] Deployment failed!")
-                    print(result.stderr)
                     return False
             else:
-                print(f"[ERROR] Deployment script {deploy_script} not found!")
+                print(f"[ERROR] Deployment script {deploy_script} not found or not executable!")
                 return False
                 
         except Exception as e:
@@ -600,34 +603,41 @@ output "agent_url" {{
     
     def print_deployment_info(self):
         """Print deployment information and next steps"""
-        network_config = self.networks[self.network]
-        agent_name = self.agent_config.get('agent', {}).get('name', 'fetch_agent') if self.agent_config else 'fetch_agent'
-        
-        print("\n" + "="*80)
-        print(f"[TARGET] DEPLOYMENT SETUP COMPLETE FOR {self.network.upper()}")
-        print("="*80)
-        print(f"Network: {network_config['description']}")
-        print(f"Agent: {agent_name}")
-        print(f"RPC URL: {network_config['rpc_url']}")
-        print(f"Chain ID: {network_config['chain_id']}")
-        print(f"Almanac: {network_config['almanac_url']}")
-        print(f"Explorer: {network_config['explorer']}")
-        print("\n[FILES] Files Created:")
-        print(f"  - .env.{self.network} (Environment configuration)")
-        print(f"  - Dockerfile (Container configuration)")
-        print(f"  - docker-compose.yml (Local deployment)")
-        print(f"  - deploy_{self.network}.sh (Deployment script)")
-        print(f"  - k8s-{self.network}.yaml (Kubernetes manifests)")
-        print(f"  - terraform-{self.network}.tf (Cloud infrastructure)")
-        
-        print("\n[DEPLOY] Next Steps:")
-        print("1. Edit .env.{self.network} with your API keys")
-        print("2. Choose deployment method:")
-        print("   Local: ./deploy_{self.network}.sh")
-        print("   Kubernetes: kubectl apply -f k8s-{self.network}.yaml")
-        print("   AWS: terraform init && terraform apply")
-        print("\n[DOCS] For more info, see DEPLOYMENT.md")
-        print("="*80)
+        network_config = self._net
+        agent_name = self._agent_name('fetch_agent')
+        
+        # Built up and written once rather than ~25 separate prints
+        lines = [
+            "",
+            "="*80,
+            f"[TARGET] DEPLOYMENT SETUP COMPLETE FOR {self.network.upper()}",
+            "="*80,
+            f"Network: {network_config['description']}",
+            f"Agent: {agent_name}",
+            f"RPC URL: {network_config['rpc_url']}",
+            f"Chain ID: {network_config['chain_id']}",
+            f"Almanac: {network_config['almanac_url']}",
+            f"Explorer: {network_config['explorer']}",
+            "",
+            "[FILES] Files Created:",
+            f"  - .env.{self.network} (Environment configuration)",
+            "  - Dockerfile (Container configuration)",
+            "  - docker-compose.yml (Local deployment)",
+            f"  - deploy_{self.network}.sh (Deployment script)",
+            f"  - k8s-{self.network}.yaml (Kubernetes manifests)",
+            f"  - terraform-{self.network}.tf.json (Cloud infrastructure)",
+            "",
+            "[DEPLOY] Next Steps:",
+            f"1. Edit .env.{self.network} with your API keys",
+            "2. Choose deployment method:",
+            f"   Local: ./deploy_{self.network}.sh",
+            f"   Kubernetes: kubectl apply -f k8s-{self.network}.yaml",
+            "   AWS: terraform init && terraform apply",
+            "",
+            "[DOCS] For more info, see DEPLOYMENT.md",
+            "="*80,
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 def main():
@@ -51,10 +51,15 @@ interface JournalEntry {
   id: string
   title: string
   timestamp: string
-  messages: Message[]
+  messages?: Message[]
+  n_messages?: number
+  preview?: string
   summary?: string
 }
 
+// Identifies this tab to the backend so its current conversation is not shared with other clients
+const SESSION_ID = crypto.randomUUID()
+
 function App() {
   const [mode, setMode] = useState<'agent' | 'journal'>('journal')
   const [selectedAgent, setSelectedAgent] = useState<string | null>(null)
@@ -66,6 +71,7 @@ function App() {
   const [isProcessing, setIsProcessing] = useState(false)
   const [liveTranscript, setLiveTranscript] = useState('')
   const [journalEntries, setJournalEntries] = useState<JournalEntry[]>([])
+  const [journalCursor, setJournalCursor] = useState<string | null>(null)
   const [selectedEntry, setSelectedEntry] = useState<string | null>(null)
   const [isSaving, setIsSaving] = useState(false)
   const [showSummary, setShowSummary] = useState(false)
@@ -150,20 +156,15 @@ function App() {
     }
   }
 
-  const loadJournalEntries = async () => {
+  const loadJournalEntries = async (cursor: string | null = null) => {
     try {
-      const response = await fetch(`${apiBaseUrl}/journal-entries`)
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+      const response = await fetch(`${apiBaseUrl}/journal-entries${query}`)
       if (response.ok) {
         const data = await response.json()
-        // Ensure timestamps in messages are Date objects
-        const entriesWithDates = data.entries.map((entry: JournalEntry) => ({
-          ...entry,
-          messages: entry.messages.map((msg: Message) => ({
-            ...msg,
-            timestamp: new Date(msg.timestamp)
-          }))
-        }))
-        setJournalEntries(entriesWithDates)
+        // The list carries no messages; they are fetched when an entry is opened
+        setJournalEntries(prev => cursor ? [...prev, ...data.entries] : data.entries)
+        setJournalCursor(data.next_cursor ?? null)
       }
     } catch (error) {
       console.error('Error loading journal entries:', error)
@@ -207,9 +208,20 @@ function App() {
         method: 'POST'
       })
       if (response.ok) {
+        // Deployment runs in the background; poll until the agent leaves the deploying state
+        setStatus('Deploying agent...')
+        for (let attempt = 0; attempt < 30; attempt++) {
+          await new Promise(resolve => setTimeout(resolve, 1000))
+          const agentResponse = await fetch(`${apiBaseUrl}/agents/${agentId}`)
+          if (!agentResponse.ok) break
+          const { agent } = await agentResponse.json()
+          if (agent.deployment_status !== 'deploying') {
+            setStatus(agent.deployment_status === 'success' ? 'Agent deployed successfully!' : 'Deployment failed')
+            break
+          }
+        }
         // Reload agents to update status
         await loadAgents()
-        setStatus('Agent deployed successfully!')
       } else {
         const error = await response.json()
         setStatus(`Deployment failed: ${error.error}`)
@@ -367,7 +379,7 @@ function App() {
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ text })
+      body: JSON.stringify({ text, session_id: SESSION_ID })
     })
 
     if (!response.ok) {
@@ -459,17 +471,30 @@ function App() {
     }, 800)
   }
 
-  const loadJournalEntry = (entryId: string) => {
-    const entry = journalEntries.find(e => e.id === entryId)
-    if (entry) {
-      // Ensure timestamps are Date objects
-      const messagesWithDates = entry.messages.map(msg => ({
-        ...msg,
-        timestamp: new Date(msg.timestamp)
-      }))
-      setMessages(messagesWithDates)
-      setSelectedEntry(entryId)
+  const loadJournalEntry = async (entryId: string) => {
+    let entry = journalEntries.find(e => e.id === entryId)
+    if (!entry) return
+    if (!entry.messages) {
+      try {
+        const response = await fetch(`${apiBaseUrl}/journal-entries/${entryId}`)
+        if (!response.ok) {
+          console.error('Failed to load journal entry:', response.status)
+          return
+        }
+        const data = await response.json()
+        entry = data.entry as JournalEntry
+      } catch (error) {
+        console.error('Error loading journal entry:', error)
+        return
+      }
     }
+    // Ensure timestamps are Date objects
+    const messagesWithDates = (entry.messages ?? []).map(msg => ({
+      ...msg,
+      timestamp: new Date(msg.timestamp)
+    }))
+    setMessages(messagesWithDates)
+    setSelectedEntry(entryId)
   }
 
   const showConversationSummary = (entryId: string) => {
@@ -506,7 +531,9 @@ function App() {
   const resetConversation = async () => {
     try {
       await fetch(`${apiBaseUrl}/reset-conversation`, {
-        method: 'POST'
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ session_id: SESSION_ID })
       })
 
       if (mode === 'journal') {
@@ -532,7 +559,9 @@ function App() {
   const startNewConversation = async () => {
     try {
       await fetch(`${apiBaseUrl}/start-new-conversation`, {
-        method: 'POST'
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ session_id: SESSION_ID })
       })
 
       if (mode === 'journal') {
@@ -1011,8 +1040,13 @@ function App() {
                               <div className="text-xs text-gray-500 dark:text-gray-400">
                                 {new Date(entry.timestamp).toLocaleString()}
                               </div>
+                              {entry.preview && (
+                                <div className="text-xs text-gray-500 dark:text-gray-400 truncate">
+                                  {entry.preview}
+                                </div>
+                              )}
                               <div className="text-xs text-gray-400 dark:text-gray-500">
-                                {entry.messages.length} messages
+                                {entry.n_messages ?? entry.messages?.length ?? 0} messages
                               </div>
                             </div>
                             <Button
@@ -1030,6 +1064,16 @@ function App() {
                         </CardContent>
                       </Card>
                     ))}
+                    {journalCursor && (
+                      <Button
+                        variant="ghost"
+                        size="sm"
+                        className="w-full"
+                        onClick={() => loadJournalEntries(journalCursor)}
+                      >
+                        Load more
+                      </Button>
+                    )}
                     {journalEntries.length === 0 && (
                       <div className="text-sm text-gray-500 text-center py-4">
                         No journal entries yet
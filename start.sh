@@ -17,7 +17,7 @@ trap cleanup SIGINT SIGTERM
 
 # Start backend server
 echo "📡 Starting backend server..."
-(cd backend && python3 voice_server.py) &
+(cd backend && gunicorn -c gunicorn.conf.py wsgi:app) &
 BACKEND_PID=$!
 
 # Wait a moment for backend to start